@@ -1,88 +1,104 @@
 import random
 from typing import Self
 
-from ga import Individual, genetic_algorithm
+from ga import Individual, Rng, genetic_algorithm, sample_distinct
+
+# Genes longer than this are summarised instead of printed bit by bit
+max_printed_bits = 64
+# Print every mutation and crossover
+verbose = False
 
 
 class NumberIndividual(Individual):
-    def __init__(self, gene: tuple):
+    def __init__(self, gene: int, length: int):
+        """
+        The gene is a bitstring packed into a Python int, so that it is the number itself.
+        length is the number of bits, leading zeros included. In tuple notation the first
+        element is the most significant bit: (1, 1, 0) is NumberIndividual(0b110, 3).
+        """
         self.gene = gene
+        self.length = length
+
+    @classmethod
+    def from_bits(cls, bits: tuple) -> Self:
+        """Create an individual from a tuple of bits, most significant bit first"""
+        return cls(int("".join(str(bit) for bit in bits) or "0", 2), len(bits))
 
     def get_fitness(self) -> float:
         """
-        Computes the decimal value of the individual
-        Return the fitness level of the individual
-
-        Explanation:
-        enumerate(list) returns a list of pairs (position, element):
-        enumerate((4, 6, 2, 8)) -> [(0, 4), (1, 6), (2, 2), (3, 8)]
-        enumerate(reversed((1, 1, 0))) -> [(0, 0), (1, 1), (2, 1)]
+        Return the fitness level of the individual, which is the decimal value of the gene.
+        Since the gene is stored as an int there is nothing left to decode.
         """
+        return self.gene
 
-        fitness = 0
-        for i, bit in enumerate(reversed(self.gene)):
-            contribution = bit * 2**i
-            fitness += contribution
-        return fitness
-      
-    def mutate(self) -> Self:
-            '''
-            Mutate an individual by randomly assigning one of its bits
-            '''
-            # index is point of mutation
-            index = int(random.uniform(0, len(self.gene)))
-            print("  Mutate: {} at {}".format(self.gene, index))
-            new_bit = random.randint(0, 1)
-            mutatedgene = tuple(self.gene[:index] + (new_bit,) + self.gene[index + 1:])
-            mutation= NumberIndividual(mutatedgene)
+    def mutate(self, rng: Rng = random) -> Self:
+        """
+        Mutate an individual by randomly assigning one of its bits,
+        which is the same as flipping it with probability 1/2: XOR with a mask holding a random bit
+        """
+        # index is point of mutation, counted from the least significant bit
+        index = rng.randrange(self.length)
+        if verbose:
+            print("  Mutate: {} at {}".format(self, index))
+        mutation = type(self)(self.gene ^ (rng.getrandbits(1) << index), self.length)
+        if verbose:
             print("    Mutation: {}".format(mutation))
-            
-            return mutation
-       
-    def reproduce(self, other: Self) -> Self:
+
+        return mutation
+
+    def reproduce(self, other: Self, rng: Rng = random) -> Self:
         """
         Reproduce this individual with another with single-point crossover
+        The child takes the c most significant bits from this individual and the rest from the other
         Return the child individual
         """
-        
-        print("  Reproduce: {} with {}".format(self, other))
-        c = random.randrange(len(self.gene))
-        print("    Crossover at {}".format(c))
-        gene = tuple(self.gene[:c] + other.gene[c:])
-        child= NumberIndividual(gene)
-         
-        print("    Child: {}".format(child.gene))
+
+        if verbose:
+            print("  Reproduce: {} with {}".format(self, other))
+        c = rng.randrange(self.length)
+        if verbose:
+            print("    Crossover at {}".format(c))
+        low_mask = (1 << (self.length - c)) - 1
+        child = type(self)((self.gene & ~low_mask) | (other.gene & low_mask), self.length)
+
+        if verbose:
+            print("    Child: {}".format(child))
         return child
 
+    def __eq__(self, other) -> bool:
+        """
+        Individuals with the same bits are equal, so duplicate genomes collapse to one in a set:
+
+        >>> len({NumberIndividual(5, 3), NumberIndividual(5, 3), NumberIndividual(1, 3)})
+        2
+        """
+        if not isinstance(other, NumberIndividual):
+            return NotImplemented
+        return self.gene == other.gene and self.length == other.length
+
     def __hash__(self):
-        return hash(self.gene)
+        return hash((self.gene, self.length))
 
     @classmethod
-    def create_random(cls, length_of_gene: int) -> Self:
-        return cls(tuple(random.randint(0, 1) for _ in range(length_of_gene)))
+    def create_random(cls, length_of_gene: int, rng: Rng = random) -> Self:
+        return cls(rng.getrandbits(length_of_gene), length_of_gene)
 
     def __repr__(self) -> str:
-        return f"Gene: {self.gene} - Fitness: {self.get_fitness()}"
+        if self.length > max_printed_bits:
+            # Python refuses to print ints of more than 4300 decimal digits, and long bitstrings are unreadable
+            return f"Gene: {self.length} bits, {self.gene.bit_count()} set - Fitness: {self.gene.bit_length()} bit number"
+        return f"Gene: {self.gene:0{self.length}b} - Fitness: {self.get_fitness()}"
 
 
-def get_initial_population(n: int, count: int) -> set[NumberIndividual]:
+def get_initial_population(n: int, count: int, rng: Rng = random) -> set[NumberIndividual]:
     """
-    Randomly generate count individuals of length n
-    Note since it's a set it disregards duplicate elements.
-
-    Be aware that since the individuals are generated randomly, but duplicates are not allowed.
-    It can take a long time if you use large numbers of count and n together.
+    Randomly generate count distinct individuals of length n.
+    The genes are count distinct numbers below 2^n, so count can be anything up to 2^n.
     """
-
     if count > 2 ** n:
         raise ValueError("Count must be less than 2^n, otherwise not enough unique individuals can be generated.")
 
-    out: set[NumberIndividual] = set()
-
-    while len(out) < count:
-        out.add(NumberIndividual.create_random(n))
-
-    return out
+    return {NumberIndividual(gene, n) for gene in sample_distinct(2 ** n, count, rng)}
 
 
 def main():
@@ -90,15 +106,15 @@ def main():
 
     # Curly brackets also creates a set, if there isn't a colon to indicate a dictionary
     initial_population = {
-        NumberIndividual((1, 1, 0)),
-        NumberIndividual((0, 0, 0)),
-        NumberIndividual((0, 1, 0)),
-        NumberIndividual((1, 0, 0))
+        NumberIndividual.from_bits((1, 1, 0)),
+        NumberIndividual.from_bits((0, 0, 0)),
+        NumberIndividual.from_bits((0, 1, 0)),
+        NumberIndividual.from_bits((1, 0, 0))
     }
     
     #initial_population = get_initial_population(3, 4)
 
-    fittest = genetic_algorithm(initial_population, minimal_fitness)
+    fittest = genetic_algorithm(initial_population, minimal_fitness, verbose=True)
     print('Fittest Individual: ' + str(fittest))
 
 
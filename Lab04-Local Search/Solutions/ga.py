@@ -1,77 +1,479 @@
+import bisect
+import csv
+import heapq
+import os
+import pickle
 import random
+import time
+import types
+from collections import Counter
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass, fields
+from operator import itemgetter
 from typing import Self
 from abc import ABC, abstractmethod
 
 default_p_mutation = 0.8
 default_num_of_generations = 30
 max_population_size = 100
+default_chunk_size = 16
+default_checkpoint_interval = 10
+default_tournament_size = 3
+# Int fitness values longer than this are summarised by their bit length in stats and logs
+max_printed_fitness_bits = 8192
 
-type Population = set[Individual]
+type Population = list[Individual]
+# Source of random numbers for the operators: a random.Random stream, or the random module itself
+type Rng = random.Random | types.ModuleType
 
 
 class Individual(ABC):
+    # Cached result of get_fitness, filled in by evaluate() or evaluate_population()
+    fitness: float | None = None
+
     @abstractmethod
     def get_fitness(self) -> float:
         """Return the fitness of the individual"""
         pass
 
     @abstractmethod
-    def mutate(self):
-        """Mutate the individual"""
+    def mutate(self, rng: Rng = random):
+        """Mutate the individual, drawing random numbers from rng"""
         pass
 
     @abstractmethod
-    def reproduce(self, other: Self) -> Self:
-        """Reproduce the individual with another individual"""
+    def reproduce(self, other: Self, rng: Rng = random) -> Self:
+        """Reproduce the individual with another individual, drawing random numbers from rng"""
         pass
 
+    def genes(self) -> Sequence | None:
+        """
+        Return the genes as a sequence with one value per locus, or None if the individual is not encoded
+        that way. Used by population_diversity.
+        """
+        return None
+
+    def evaluate(self) -> float:
+        """Return the cached fitness, computing it with get_fitness the first time"""
+        if self.fitness is None:
+            self.fitness = self.get_fitness()
+        return self.fitness
+
     def __lt__(self, other: Self) -> bool:
-        return self.get_fitness() < other.get_fitness()
+        return self.evaluate() < other.evaluate()
 
     def __repr__(self):
-        return f"Fitness: {self.get_fitness()}"
+        return f"Fitness: {self.evaluate()}"
+
+
+@dataclass
+class GenerationStats:
+    """Aggregates of one generation, passed to the on_generation callback of genetic_algorithm"""
+    generation: int
+    best_fitness: float
+    mean_fitness: float
+    # See population_diversity, None if genetic_algorithm was run without diversity_stats
+    diversity: float | None
+    p_mutation: float
+    # Fitness evaluations in this generation and in total so far
+    evaluations: int
+    total_evaluations: int
+    generation_seconds: float
+    elapsed_seconds: float
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{field.name}={printable_fitness(getattr(self, field.name))!r}"
+                           for field in fields(self))
+        return f"GenerationStats({values})"
+
+
+def printable_fitness(value: float) -> float | str:
+    """
+    Return value, or a summary like "5000 bit number" for an int too long to print. Python refuses
+    to convert ints of more than 4300 decimal digits to str, which long NumberIndividual genes reach.
+    """
+    if isinstance(value, int) and value.bit_length() > max_printed_fitness_bits:
+        return f"{value.bit_length()} bit number"
+    return value
+
+
+def mean_fitness(population: Population) -> float:
+    """
+    Return the mean fitness of the evaluated population. Int fitness values too large for a float
+    fall back to integer division.
+    """
+    total = sum(individual.evaluate() for individual in population)
+    try:
+        return total / len(population)
+    except OverflowError:
+        return total // len(population)
+
+
+class CsvLogger:
+    """
+    on_generation callback which appends the stats of every generation as a row to a CSV file
+
+        with open("run.csv", "w", newline="") as file:
+            genetic_algorithm(population, minimal_fitness, on_generation=CsvLogger(file))
+    """
+
+    def __init__(self, file):
+        self.writer = csv.DictWriter(file, fieldnames=[field.name for field in fields(GenerationStats)])
+        self.writer.writeheader()
+
+    def __call__(self, stats: GenerationStats) -> None:
+        self.writer.writerow({name: printable_fitness(value) for name, value in asdict(stats).items()})
+
+
+@dataclass
+class Checkpoint:
+    """Everything needed to continue a genetic_algorithm run exactly where it was saved"""
+    # The next generation to run
+    generation: int
+    population: Population
+    fittest_individual: Individual | None
+    total_evaluations: int
+    random_state: tuple
+    stagnant_generations: int = 0
+
+
+def make_rng(seed: int | None, *stream: int | str) -> random.Random:
+    """
+    Return a random number generator for one stream of a seeded run, for example make_rng(seed, island,
+    generation). Every combination of seed and stream numbers gives its own independent generator, which
+    is the same on every run and in every process, so work can be split up without changing the results.
+    Without a seed the generator is seeded from the operating system.
+    """
+    if seed is None:
+        return random.Random()
+    # String seeds are hashed with SHA-512, so nearby stream numbers still give unrelated generators
+    return random.Random("/".join(str(part) for part in (seed, *stream)))
+
+
+def sample_distinct(space_size: int, count: int, rng: Rng = random) -> list[int]:
+    """
+    Return count distinct integers from range(space_size) in random order, using Floyd's algorithm.
+    It draws exactly count random numbers and never retries, so it takes O(count) time and memory
+    even when count is close to space_size or space_size is a huge int like 2^n or n^n.
+    Populations are built by decoding the integers into genes.
+    """
+    if count > space_size:
+        raise ValueError(f"Cannot sample {count} distinct values from a space of {space_size}")
+
+    # A dict keeps the insertion order, which makes the result the same on every run for a seeded rng
+    chosen: dict[int, None] = {}
+    for j in range(space_size - count, space_size):
+        value = rng.randrange(j + 1)
+        chosen[j if value in chosen else value] = None
+
+    # Floyd's algorithm picks a uniformly random subset, but large values tend to come last
+    values = list(chosen)
+    rng.shuffle(values)
+    return values
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint) -> None:
+    """
+    Pickle the checkpoint to path. It is written to a temporary file first and then renamed, so a crash
+    while saving leaves the previous checkpoint intact.
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path: str) -> Checkpoint:
+    with open(path, "rb") as file:
+        return pickle.load(file)
 
 
 # noinspection DuplicatedCode
-def genetic_algorithm(population: Population,
+def genetic_algorithm(population: Iterable[Individual],
                       minimal_fitness: float,
                       num_of_generations: int = default_num_of_generations,
                       should_trim_population: bool = False,
-                      p_mutation=default_p_mutation) -> Individual | None:
+                      p_mutation=default_p_mutation,
+                      executor: Executor | None = None,
+                      chunk_size: int = default_chunk_size,
+                      population_size: int = max_population_size,
+                      elitism: int | None = None,
+                      allow_duplicates: bool = False,
+                      verbose: bool = False,
+                      on_generation: Callable[[GenerationStats], None] | None = None,
+                      diversity_stats: bool = True,
+                      checkpoint_path: str | None = None,
+                      checkpoint_interval: int = default_checkpoint_interval,
+                      stagnation_limit: int | None = None,
+                      immigrant_factory: Callable[[Rng], Individual] | None = None,
+                      adaptive_mutation: tuple[float, float] | None = None,
+                      seed: int | None = None,
+                      island: int = 0,
+                      selection: str = "roulette") -> Individual | None:
+    """
+    Evolve the population until an individual reaches minimal_fitness or num_of_generations have passed.
+    Parents are picked with selection "roulette" (random_selection) or "tournament" (tournament_selection).
+    How the next generation is chosen from parents and children is described in replace_population.
+
+    If an executor (ProcessPoolExecutor or ThreadPoolExecutor) is given, the offspring of each generation
+    are scored in it before selection, see evaluate_population. With a process pool the individuals
+    must be picklable.
+
+    Nothing is printed unless verbose, which prints every generation and every selection. Use
+    on_generation to follow a run instead: it is called with a GenerationStats after every generation.
+    Without diversity_stats its diversity is None, which saves computing it for runs that are timed.
+
+    With a checkpoint_path the population, generation counter, state of the random module and fittest
+    individual so far are saved there every checkpoint_interval generations and when the run ends.
+    If the file already exists, the run resumes from it instead of starting from the given population,
+    and continues exactly as the original run would have, as long as the same arguments are used.
+    num_of_generations counts from the start of the original run.
+
+    With a stagnation_limit the run also ends when the fittest individual has not improved for that many
+    generations. If an immigrant_factory is given, the population is restarted instead: the fittest
+    individuals (elitism, at least one) are kept and the rest is replaced by new individuals from the factory.
+
+    With adaptive_mutation = (low, high), p_mutation is replaced by a probability between low and high
+    which rises as the population loses diversity: low + (high - low) * (1 - diversity).
+
+    With a seed, every generation draws its random numbers from its own stream make_rng(seed, island,
+    generation) instead of the random module, so a run can be reproduced exactly. The fitness evaluation
+    uses no random numbers, so runs with and without an executor give the same result.
+    Give every island of an island model its own island number to get independent streams.
+    """
     generation: int = 0
+    first_generation: int = 0
     fittest_individual: Individual | None = None
+    stagnant_generations: int = 0
+
+    start_time = time.perf_counter()
+
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        checkpoint = load_checkpoint(checkpoint_path)
+        first_generation = generation = checkpoint.generation
+        population = checkpoint.population
+        fittest_individual = checkpoint.fittest_individual
+        total_evaluations = checkpoint.total_evaluations
+        stagnant_generations = checkpoint.stagnant_generations
+        random.setstate(checkpoint.random_state)
+    else:
+        population = list(population)
+        total_evaluations = evaluate_population(population, executor, chunk_size)
+
+    # The diversity is only computed when something reads it, it costs about as much as a fitness evaluation
+    track_diversity = adaptive_mutation is not None or (on_generation is not None and diversity_stats)
+    diversity = population_diversity(population) if track_diversity else None
+
+    for generation in range(first_generation, num_of_generations):
+        if verbose:
+            print(f"Generation {generation}:")
+            print_population(population)
+
+        if adaptive_mutation is not None:
+            low, high = adaptive_mutation
+            p_mutation = low + (high - low) * (1 - diversity)
+
+        generation_start_time = time.perf_counter()
+        # Every child is a new individual, so a generation scores one child per parent
+        evaluations = len(population)
+        rng = random if seed is None else make_rng(seed, island, generation)
+        population = evolve_generation(population, p_mutation, should_trim_population, population_size,
+                                       executor, chunk_size, elitism, allow_duplicates, verbose, rng,
+                                       selection)
+        total_evaluations += evaluations
+        if track_diversity:
+            diversity = population_diversity(population)
+
+        fittest_in_generation = get_fittest_individual(population)
+        if fittest_individual is None or fittest_individual < fittest_in_generation:
+            fittest_individual = fittest_in_generation
+            stagnant_generations = 0
+        else:
+            stagnant_generations += 1
+
+        if on_generation is not None:
+            now = time.perf_counter()
+            on_generation(GenerationStats(
+                generation=generation,
+                best_fitness=fittest_in_generation.evaluate(),
+                mean_fitness=mean_fitness(population),
+                diversity=diversity,
+                p_mutation=p_mutation,
+                evaluations=evaluations,
+                total_evaluations=total_evaluations,
+                generation_seconds=now - generation_start_time,
+                elapsed_seconds=now - start_time))
+
+        finished = minimal_fitness <= fittest_individual.evaluate()
+
+        if not finished and stagnation_limit is not None and stagnant_generations >= stagnation_limit:
+            if immigrant_factory is None:
+                finished = True
+            else:
+                population = restart_population(population, immigrant_factory, max(elitism or 1, 1), rng)
+                total_evaluations += evaluate_population(population, executor, chunk_size)
+                if track_diversity:
+                    diversity = population_diversity(population)
+                stagnant_generations = 0
+
+        if checkpoint_path is not None and (finished or (generation + 1) % checkpoint_interval == 0
+                                            or generation + 1 == num_of_generations):
+            save_checkpoint(checkpoint_path, Checkpoint(generation + 1, population, fittest_individual,
+                                                        total_evaluations, random.getstate(),
+                                                        stagnant_generations))
+
+        if finished:
+            break
 
-    for generation in range(num_of_generations):
-        print(f"Generation {generation}:")
+    if verbose:
+        print(f"Final generation {generation}:")
         print_population(population)
 
-        new_population: Population = set()
+    return fittest_individual
 
-        for i in range(len(population)):
-            mother, father = random_selection(population)
-            child = mother.reproduce(father)
 
-            if random.uniform(0, 1) < p_mutation:
-                child = child.mutate()
+def evolve_generation(population: Population,
+                      p_mutation: float = default_p_mutation,
+                      should_trim_population: bool = False,
+                      population_size: int = max_population_size,
+                      executor: Executor | None = None,
+                      chunk_size: int = default_chunk_size,
+                      elitism: int | None = None,
+                      allow_duplicates: bool = False,
+                      verbose: bool = False,
+                      rng: Rng = random,
+                      selection: str = "roulette") -> Population:
+    """
+    Run a single generation of the genetic algorithm: breed len(population) children, score them and
+    return the survivors chosen by replace_population.
+    """
+    # A list keeps the offspring in creation order, so the evaluation batches do not
+    # depend on the hash order of a set
+    offspring: list[Individual] = []
 
-            new_population.add(child)
+    if selection not in ("roulette", "tournament"):
+        raise ValueError(f"Unknown selection scheme {selection}, use roulette or tournament")
 
-        # Add new population to population, use union to disregard
-        # duplicate individuals
-        population = population.union(new_population)
+    # The parents do not change during a generation, so their fitness totals are computed once
+    totals = fitness_totals(population, verbose) if selection == "roulette" else None
 
-        if should_trim_population:
-            population = trim_population(population, max_population_size)
+    for i in range(len(population)):
+        if selection == "roulette":
+            mother, father = random_selection(population, verbose, totals, rng)
+        else:
+            mother, father = tournament_selection(population, rng=rng)
+        child = mother.reproduce(father, rng)
 
-        fittest_individual = get_fittest_individual(population)
+        if rng.uniform(0, 1) < p_mutation:
+            child = child.mutate(rng)
 
-        if minimal_fitness <= fittest_individual.get_fitness():
-            break
+        offspring.append(child)
 
-    print(f"Final generation {generation}:")
-    print_population(population)
+    evaluate_population(offspring, executor, chunk_size)
 
-    return fittest_individual
+    if not should_trim_population:
+        # Without trimming the population keeps growing like the union of parents and children
+        # used to, except with generational replacement, which keeps the size of the parents
+        population_size = len(population) + len(offspring) if elitism is None else len(population)
+
+    return replace_population(population, offspring, population_size, elitism, allow_duplicates)
+
+
+def replace_population(parents: Population,
+                       offspring: Population,
+                       population_size: int,
+                       elitism: int | None = None,
+                       allow_duplicates: bool = False) -> Population:
+    """
+    Choose the next generation from evaluated parents and offspring.
+
+    With elitism None, parents and offspring compete together and the population_size fittest survive,
+    (mu + lambda) selection. With elitism set to a number e, the e fittest parents survive and the rest
+    of the population is filled with the fittest offspring (generational replacement).
+    Unless allow_duplicates, equal individuals (same hash and ==, like in a set) are kept once.
+
+    The individuals are paired with their cached fitness, and heapq.nlargest picks the k fittest pairs
+    in O(n log k) without calling __lt__ or sorting the whole population.
+    """
+    if elitism is None:
+        candidates = parents + offspring
+        if not allow_duplicates:
+            # dict.fromkeys removes duplicates like a set does, but keeps the order
+            candidates = list(dict.fromkeys(candidates))
+        pairs = [(individual.evaluate(), individual) for individual in candidates]
+        return [individual for _, individual in heapq.nlargest(population_size, pairs, key=itemgetter(0))]
+
+    if not allow_duplicates:
+        parents = list(dict.fromkeys(parents))
+
+    elites = heapq.nlargest(min(elitism, population_size),
+                            [(parent.evaluate(), parent) for parent in parents], key=itemgetter(0))
+
+    if not allow_duplicates:
+        elite_individuals = {elite for _, elite in elites}
+        offspring = [child for child in dict.fromkeys(offspring) if child not in elite_individuals]
+
+    children = heapq.nlargest(population_size - len(elites),
+                              [(child.evaluate(), child) for child in offspring], key=itemgetter(0))
+
+    return [individual for _, individual in elites + children]
+
+
+def restart_population(population: Population,
+                       immigrant_factory: Callable[[Rng], Individual],
+                       num_of_elites: int,
+                       rng: Rng = random) -> Population:
+    """Keep the num_of_elites fittest individuals and replace the rest of the population with immigrants"""
+    elites = heapq.nlargest(num_of_elites, population)
+    return elites + [immigrant_factory(rng) for _ in range(len(population) - len(elites))]
+
+
+def population_diversity(population: Population) -> float:
+    """
+    Return the diversity of the population, from 0 when all individuals are equal towards 1.
+
+    If the individuals have genes, the genes form a matrix with one row per individual, and the
+    diversity is the fraction of entries that differ from the most common value in their column.
+    Otherwise it is the fraction of individuals with a distinct hash.
+    """
+    gene_matrix = [individual.genes() for individual in population]
+
+    if any(genes is None for genes in gene_matrix):
+        return len({hash(individual) for individual in population}) / len(population)
+
+    entries = len(population) * len(gene_matrix[0])
+    most_common = sum(Counter(column).most_common(1)[0][1] for column in zip(*gene_matrix))
+    return 1 - most_common / entries
+
+
+def compute_fitness(individual: Individual) -> float:
+    # Module level function, so it can be pickled and sent to worker processes
+    return individual.get_fitness()
+
+
+def evaluate_population(individuals: Iterable[Individual],
+                        executor: Executor | None = None,
+                        chunk_size: int = default_chunk_size) -> int:
+    """
+    Compute the fitness of every individual that has not been evaluated yet and cache it on the individual.
+
+    Without an executor the individuals are scored one at a time. With an executor they are sent to it
+    in chunks of chunk_size; executor.map returns the results in input order, so the fitness values are
+    written back to the right individuals no matter which worker finishes first.
+    Return the number of fitness evaluations performed.
+    """
+    pending = [individual for individual in individuals if individual.fitness is None]
+
+    if executor is None:
+        for individual in pending:
+            individual.fitness = individual.get_fitness()
+    else:
+        results = executor.map(compute_fitness, pending, chunksize=chunk_size)
+        for individual, fitness in zip(pending, results):
+            individual.fitness = fitness
+
+    return len(pending)
 
 
 def print_population(population: Population) -> None:
@@ -84,47 +486,81 @@ def print_population(population: Population) -> None:
         print(individual)
 
 
-def random_selection(population: Population) -> tuple[Individual, Individual]:
+def random_selection(population: Population,
+                     verbose: bool = False,
+                     totals: list | None = None,
+                     rng: Rng = random) -> tuple[Individual, Individual]:
     """
     Compute fitness contribution of each individual in population according to the individuals fitness and add up
     the total. Then choose 2 from sequence based on percentage contribution to
     total fitness of population.
     Return selected variable which holds two individuals that were chosen as
     the mother and the father
+    The totals can be passed in when they are already known from fitness_totals(population).
+    If verbose, print the population, the totals and the picks.
     """
     # Python sets are randomly ordered. Since we traverse the set twice, we
     # want to do it in the same order. So let's convert it temporarily to a
     # list.
-    
-    ordered_population = list(population)
-    print('Ordered Population: ' + str(ordered_population))
+    ordered_population = population if isinstance(population, list) else list(population)
+
+    if totals is None:
+        totals = fitness_totals(ordered_population, verbose)
+
+    mother = pick_individual(totals, ordered_population, verbose, rng)
+    father = pick_individual(totals, ordered_population, verbose, rng)
+   
+    return mother, father
+
+
+def tournament_selection(population: Population,
+                         tournament_size: int = default_tournament_size,
+                         rng: Rng = random) -> tuple[Individual, Individual]:
+    """
+    Pick the mother and the father each as the fittest of tournament_size individuals drawn at random.
+    Only the order of the fitness values matters, so unlike the roulette wheel this also works when
+    fitness values are negative, as for N-Queens.
+    """
+    mother = max(rng.choices(population, k=tournament_size))
+    father = max(rng.choices(population, k=tournament_size))
+    return mother, father
 
-    totals = [] 
+
+def fitness_totals(ordered_population: list[Individual], verbose: bool = False) -> list:
+    """Return the running totals of the fitness of the individuals, in order"""
+    if verbose:
+        print('Ordered Population: ' + str(ordered_population))
+
+    totals = []
     running_total = 0
     for item in ordered_population:
-        fitness = item.get_fitness() 
+        fitness = item.evaluate()
         running_total = running_total + fitness
         totals.append(running_total)
-    print('Totals: ' + str(totals))
-    print('Running total: ' + str(running_total))
+    if verbose:
+        print('Totals: ' + str(totals))
+        print('Running total: ' + str(running_total))
 
-    mother = pick_individual(totals, ordered_population)
-    father = pick_individual(totals, ordered_population)
-   
-    return mother, father
+    return totals
 
 
-def pick_individual(totals: list, ordered_population: list[Individual])-> Individual:
+def pick_individual(totals: list,
+                    ordered_population: list[Individual],
+                    verbose: bool = False,
+                    rng: Rng = random) -> Individual:
     """Randomly generate a number for the chosen fitness and pick an individual based on the number."""
     
-    r = random.uniform(0, 1)
-    print('Random number: ' + str(r)) 
+    r = rng.uniform(0, 1)
+    if verbose:
+        print('Random number: ' + str(r))
     running_total = totals[-1]
-    for i, individual in enumerate(ordered_population):
-        if r <  totals[i]  / float(running_total):
-             selected=individual
-             break
-    print('Selected: ' + str(selected))
+    # Pick the first individual with r < totals[i] / running_total. The fractions only grow along the
+    # list, so binary search finds it in O(log n). Plain true division, so fitness values too large
+    # for a float (long bitstrings) still work
+    i = bisect.bisect_right(totals, r, key=lambda total: total / running_total)
+    selected = ordered_population[min(i, len(ordered_population) - 1)]
+    if verbose:
+        print('Selected: ' + str(selected))
     return selected
 
     
@@ -140,7 +576,4 @@ def trim_population(population: Population, desired_length: int) -> Population:
     if len(population) <= desired_length:
         return population
 
-    population_list = sorted(population, reverse=True)
-    population_list = population_list[:desired_length]
-
-    return set(population_list)
+    return replace_population(population, [], desired_length, allow_duplicates=True)
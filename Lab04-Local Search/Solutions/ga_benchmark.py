@@ -0,0 +1,180 @@
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+
+from ga import GenerationStats, Individual, Population, genetic_algorithm, make_rng
+from nqueens_ga import get_initial_population as get_board_population
+from nqueens_permutation import crossover_operators
+from nqueens_permutation import get_initial_population as get_permutation_population
+
+# Benchmark harness for the genetic algorithm on N-Queens. Every combination of board size, population
+# size, mutation probability, selection scheme and encoding is run once per seed, and the median time
+# to solution, evaluations per second and success rate are written to a JSON file, so runs on different
+# commits can be compared.
+#
+# Example:
+#   python ga_benchmark.py --sizes 8 16 32 --population-sizes 50 100 --selections tournament \
+#       --encodings board ox --seeds 5 --output benchmark.json
+
+default_sizes = (8, 16, 32)
+default_population_sizes = (50,)
+default_mutation_probabilities = (0.8,)
+# The N-Queens fitness is the negated number of conflicts, at most 0, and the roulette wheel of
+# random_selection gives boards with more conflicts a larger share and a solved board none.
+# Roulette can still be chosen to show that, and the report carries roulette_note.
+default_selections = ("tournament",)
+roulette_note = ("roulette selection is biased towards boards with more conflicts on N-Queens, whose fitness "
+                 "is at most 0, and never picks a solved board")
+# "board" is the n^n encoding from nqueens_ga, the others are permutation boards with that crossover
+default_encodings = ("board", "ox")
+default_num_of_seeds = 5
+default_num_of_generations = 500
+default_output = "ga_benchmark.json"
+
+
+@dataclass
+class RunResult:
+    seed: int
+    solved: bool
+    best_fitness: float
+    generations: int
+    evaluations: int
+    seconds: float
+
+
+@dataclass
+class BenchmarkResult:
+    n: int
+    population_size: int
+    p_mutation: float
+    selection: str
+    encoding: str
+    runs: int
+    success_rate: float
+    # Median over the solved runs only, None if no run was solved
+    median_seconds_to_solution: float | None
+    median_generations_to_solution: float | None
+    evaluations_per_second: float
+    run_results: list[RunResult]
+
+
+def initial_population(encoding: str, n: int, population_size: int, seed: int) -> Population:
+    rng = make_rng(seed, "initial")
+    if encoding == "board":
+        return list(get_board_population(n, population_size, rng))
+    return list(get_permutation_population(n, population_size, encoding, "swap", rng))
+
+
+def run_once(n: int, population_size: int, p_mutation: float, selection: str, encoding: str,
+             num_of_generations: int, seed: int) -> RunResult:
+    """Run the GA once from a seeded initial population and record how long it took to find a solution"""
+    population = initial_population(encoding, n, population_size, seed)
+    history: list[GenerationStats] = []
+
+    start_time = time.perf_counter()
+    fittest: Individual = genetic_algorithm(population, 0,
+                                            num_of_generations=num_of_generations,
+                                            should_trim_population=True,
+                                            p_mutation=p_mutation,
+                                            population_size=population_size,
+                                            on_generation=history.append,
+                                            # The diversity costs about as much as the fitness evaluation
+                                            diversity_stats=False,
+                                            seed=seed,
+                                            selection=selection)
+    seconds = time.perf_counter() - start_time
+
+    return RunResult(seed=seed,
+                     solved=fittest.evaluate() >= 0,
+                     best_fitness=fittest.evaluate(),
+                     generations=len(history),
+                     evaluations=history[-1].total_evaluations if history else len(population),
+                     seconds=seconds)
+
+
+def summarize(n: int, population_size: int, p_mutation: float, selection: str, encoding: str,
+              runs: list[RunResult]) -> BenchmarkResult:
+    solved = [run for run in runs if run.solved]
+    total_seconds = sum(run.seconds for run in runs)
+    return BenchmarkResult(
+        n=n,
+        population_size=population_size,
+        p_mutation=p_mutation,
+        selection=selection,
+        encoding=encoding,
+        runs=len(runs),
+        success_rate=len(solved) / len(runs),
+        median_seconds_to_solution=statistics.median(run.seconds for run in solved) if solved else None,
+        median_generations_to_solution=statistics.median(run.generations for run in solved) if solved else None,
+        evaluations_per_second=sum(run.evaluations for run in runs) / total_seconds if total_seconds else 0.0,
+        run_results=runs)
+
+
+def benchmark(sizes=default_sizes,
+              population_sizes=default_population_sizes,
+              mutation_probabilities=default_mutation_probabilities,
+              selections=default_selections,
+              encodings=default_encodings,
+              num_of_seeds: int = default_num_of_seeds,
+              num_of_generations: int = default_num_of_generations,
+              on_result: Callable[[BenchmarkResult], None] | None = None) -> list[BenchmarkResult]:
+    """Run every combination of the given settings for seeds 0 .. num_of_seeds - 1"""
+    results = []
+    for n, population_size, p_mutation, selection, encoding in itertools.product(
+            sizes, population_sizes, mutation_probabilities, selections, encodings):
+        runs = [run_once(n, population_size, p_mutation, selection, encoding, num_of_generations, seed)
+                for seed in range(num_of_seeds)]
+        result = summarize(n, population_size, p_mutation, selection, encoding, runs)
+        if on_result is not None:
+            on_result(result)
+        results.append(result)
+    return results
+
+
+def print_result(result: BenchmarkResult) -> None:
+    median = result.median_seconds_to_solution
+    median_text = f"{median * 1000:>10.1f} ms" if median is not None else f"{'-':>13}"
+    print(f"n = {result.n:>5} pop {result.population_size:>4} p_mut {result.p_mutation:.2f} "
+          f"{result.selection:<10} {result.encoding:<6} median {median_text}, "
+          f"{result.evaluations_per_second:>10.0f} evals/s, solved {result.success_rate:.0%}")
+
+
+def main():
+    encodings = ("board", *crossover_operators)
+    parser = argparse.ArgumentParser(description="Benchmark the genetic algorithm on N-Queens")
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes)
+    parser.add_argument("--population-sizes", type=int, nargs="+", default=default_population_sizes)
+    parser.add_argument("--mutation-probabilities", type=float, nargs="+", default=default_mutation_probabilities)
+    parser.add_argument("--selections", nargs="+", choices=("roulette", "tournament"), default=default_selections)
+    parser.add_argument("--encodings", nargs="+", choices=encodings, default=default_encodings)
+    parser.add_argument("--seeds", type=int, default=default_num_of_seeds, help="number of seeds per setting")
+    parser.add_argument("--generations", type=int, default=default_num_of_generations,
+                        help="give up on a run after this many generations")
+    parser.add_argument("--output", default=default_output, help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    results = benchmark(args.sizes, args.population_sizes, args.mutation_probabilities, args.selections,
+                        args.encodings, args.seeds, args.generations, on_result=print_result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": [asdict(result) for result in results],
+    }
+    if "roulette" in args.selections:
+        print(f"\nNote: {roulette_note}")
+        report["notes"] = [roulette_note]
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import heapq
+import multiprocessing
+import queue
+import random
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from ga import (Individual, Population, default_p_mutation, evolve_generation, get_fittest_individual,
+                make_rng, replace_population)
+from nqueens_ga import get_initial_population
+
+# The island model runs several populations side by side, one per process. Every migration_interval
+# generations each island sends copies of its fittest individuals to the next island on a ring
+# (0 -> 1 -> ... -> K-1 -> 0). The islands evolve independently in between, which keeps more
+# diversity than one big population, and they use all cores.
+
+default_num_of_islands = 4
+default_num_of_generations = 100
+default_migration_interval = 5
+default_migration_size = 2
+# How often (in seconds) an island waiting for migrants checks whether the run has been stopped
+migrant_poll_interval = 0.1
+
+
+@dataclass
+class IslandStats:
+    island: int
+    generations: int = 0
+    migrations: int = 0
+    # Fitness of the fittest individual on the island after each generation
+    best_fitness_history: list[float] = field(default_factory=list)
+    best_fitness: float | None = None
+    reached_target: bool = False
+    elapsed_seconds: float = 0.0
+
+
+def island_model(populations: list[Iterable[Individual]],
+                 minimal_fitness: float,
+                 num_of_generations: int = default_num_of_generations,
+                 population_size: int | None = None,
+                 p_mutation: float = default_p_mutation,
+                 migration_interval: int = default_migration_interval,
+                 migration_size: int = default_migration_size,
+                 seed: int | None = None,
+                 selection: str = "roulette") -> tuple[Individual, list[IslandStats]]:
+    """
+    Evolve one island per population in its own process and return the fittest individual found on
+    any island together with the statistics of every island.
+    All islands stop as soon as one of them reaches minimal_fitness.
+    Each island keeps at most population_size individuals (default: the size of its initial population).
+    Island i draws the random numbers of generation g from make_rng(seed, i, g), so with a seed the
+    islands are independent of each other and a run can be repeated.
+    Parents are picked with selection "roulette" or "tournament" as in genetic_algorithm. Use
+    "tournament" when fitness values can be negative, like for N-Queens.
+    """
+    num_of_islands = len(populations)
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    # inboxes[i] receives the migrants for island i, island i sends to inboxes[i + 1]
+    inboxes = [multiprocessing.Queue() for _ in range(num_of_islands)]
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+
+    processes = []
+    for island, population in enumerate(populations):
+        process = multiprocessing.Process(
+            target=run_island,
+            args=(island, population, minimal_fitness, num_of_generations,
+                  population_size or len(population), p_mutation, migration_interval, migration_size,
+                  inboxes[island], inboxes[(island + 1) % num_of_islands], stop, results, seed,
+                  selection))
+        process.start()
+        processes.append(process)
+
+    # Read the results before joining, a process does not exit until its queued data has been consumed
+    collected = sorted((results.get() for _ in processes), key=lambda result: result[0])
+
+    for process in processes:
+        process.join()
+
+    fittest = max(individual for _, individual, _ in collected)
+    return fittest, [stats for _, _, stats in collected]
+
+
+def run_island(island: int,
+               population: Iterable[Individual],
+               minimal_fitness: float,
+               num_of_generations: int,
+               population_size: int,
+               p_mutation: float,
+               migration_interval: int,
+               migration_size: int,
+               inbox: multiprocessing.Queue,
+               outbox: multiprocessing.Queue,
+               stop,
+               results: multiprocessing.Queue,
+               seed: int,
+               selection: str = "roulette") -> None:
+    """
+    Body of an island process. Puts (island, fittest individual, stats) on results when done.
+    """
+    population = list(population)
+    stats = IslandStats(island)
+    start_time = time.perf_counter()
+
+    for generation in range(num_of_generations):
+        if stop.is_set():
+            break
+
+        population = evolve_generation(population, p_mutation, True, population_size,
+                                       rng=make_rng(seed, island, generation), selection=selection)
+        fittest = get_fittest_individual(population)
+        stats.generations += 1
+        stats.best_fitness_history.append(fittest.evaluate())
+
+        if minimal_fitness <= fittest.evaluate():
+            stats.reached_target = True
+            stop.set()
+            break
+
+        if (generation + 1) % migration_interval == 0:
+            population, migrated = migrate(population, population_size, migration_size, inbox, outbox, stop)
+            stats.migrations += migrated
+
+    fittest = get_fittest_individual(population)
+    stats.best_fitness = fittest.evaluate()
+    stats.elapsed_seconds = time.perf_counter() - start_time
+
+    # Migrants sent to an island which has already finished are never read, do not wait for them on exit
+    outbox.cancel_join_thread()
+    results.put((island, fittest, stats))
+
+
+def migrate(population: Population,
+            population_size: int,
+            migration_size: int,
+            inbox: multiprocessing.Queue,
+            outbox: multiprocessing.Queue,
+            stop) -> tuple[Population, bool]:
+    """
+    Send the migration_size fittest individuals to the next island and merge in the migrants from
+    the previous island. Returns the new population and whether migrants arrived; the population is
+    unchanged if the run is stopped while waiting.
+    """
+    emigrants = heapq.nlargest(migration_size, population)
+    outbox.put(emigrants)
+
+    while True:
+        try:
+            immigrants = inbox.get(timeout=migrant_poll_interval)
+            break
+        except queue.Empty:
+            if stop.is_set():
+                return population, False
+
+    return replace_population(population, immigrants, population_size), True
+
+
+def main():
+    n = 16
+    population_size = 50
+    target_fitness = 0
+
+    populations = [get_initial_population(n, population_size) for _ in range(default_num_of_islands)]
+
+    start_time = time.perf_counter()
+    fittest, island_stats = island_model(populations, target_fitness, seed=1, selection="tournament")
+    elapsed_time = time.perf_counter() - start_time
+
+    for stats in island_stats:
+        print(f"Island {stats.island}: {stats.generations} generations, {stats.migrations} migrations, "
+              f"best fitness {stats.best_fitness}, reached target: {stats.reached_target}, "
+              f"{stats.elapsed_seconds:.2f} s")
+
+    print(f"\nBest solution found in {elapsed_time:.2f} s:")
+    print(fittest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+import math
+import random
+import time
+from collections.abc import Callable
+from typing import Self
+
+from ga import Individual, Rng, genetic_algorithm
+from nqueens_ga import fitness_fn_negative
+from nqueens_permutation import PermutationBoard, fitness_fn_diagonal, get_initial_population
+
+# Local search engines for N-Queens next to the genetic algorithm:
+# - min_conflicts: hill climbing on a permutation board, repairing one attacked queen at a time with
+#   the swap that removes the most conflicts. The queens per diagonal are kept in counters which are
+#   updated on every swap, so a step costs O(1) instead of recounting the board, and boards with
+#   n >= 10^5 queens can be solved.
+# - simulated_annealing: works on any Individual, using mutate() as the neighbour function.
+
+type Schedule = Callable[[int], float]
+
+default_max_steps = 1_000_000
+# Number of random swap partners tried for an attacked queen in each min-conflicts step
+default_swap_candidates = 32
+# Number of random rows tried per column when building the initial board for min_conflicts
+default_placement_attempts = 32
+
+
+class DiagonalCounters:
+    """
+    The number of queens on every diagonal of a permutation board, with O(1) updates and conflict
+    counts for swapping two columns.
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self.rising = [0] * (2 * n - 1)
+        self.falling = [0] * (2 * n - 1)
+
+    @classmethod
+    def from_board(cls, board: list[int]) -> Self:
+        counters = cls(len(board))
+        for column, row in enumerate(board):
+            counters.add(column, row)
+        return counters
+
+    def add(self, column: int, row: int) -> None:
+        self.rising[column + row] += 1
+        self.falling[column - row + self.n - 1] += 1
+
+    def remove(self, column: int, row: int) -> None:
+        self.rising[column + row] -= 1
+        self.falling[column - row + self.n - 1] -= 1
+
+    def attackers(self, column: int, row: int) -> int:
+        """Number of other queens on the diagonals of the queen at (column, row)"""
+        return self.rising[column + row] + self.falling[column - row + self.n - 1] - 2
+
+    def is_free(self, column: int, row: int) -> bool:
+        """True if no queen is on a diagonal through the (empty) square (column, row)"""
+        return self.rising[column + row] == 0 and self.falling[column - row + self.n - 1] == 0
+
+    def swap_delta(self, board: list[int], i: int, j: int) -> int:
+        """Change in the number of conflicting pairs if the rows of columns i and j are swapped"""
+        row_i, row_j = board[i], board[j]
+        # A queen taken off a diagonal with k queens left on it removes k pairs, and a queen put on a
+        # diagonal with k queens already on it adds k pairs
+        self.remove(i, row_i)
+        delta = -(self.rising[i + row_i] + self.falling[i - row_i + self.n - 1])
+        self.remove(j, row_j)
+        delta -= self.rising[j + row_j] + self.falling[j - row_j + self.n - 1]
+        self.add(i, row_j)
+        delta += self.rising[i + row_j] + self.falling[i - row_j + self.n - 1] - 2
+        self.add(j, row_i)
+        delta += self.rising[j + row_i] + self.falling[j - row_i + self.n - 1] - 2
+        self.remove(i, row_j)
+        self.remove(j, row_i)
+        self.add(i, row_i)
+        self.add(j, row_j)
+        return delta
+
+    def swap(self, board: list[int], i: int, j: int) -> None:
+        self.remove(i, board[i])
+        self.remove(j, board[j])
+        board[i], board[j] = board[j], board[i]
+        self.add(i, board[i])
+        self.add(j, board[j])
+
+
+def greedy_permutation(n: int,
+                       placement_attempts: int = default_placement_attempts,
+                       rng: Rng = random) -> list[int]:
+    """
+    Build a permutation board column by column, trying up to placement_attempts of the unused rows
+    for each column and taking the first one without a diagonal conflict. Most columns get a free
+    square this way, so min_conflicts only has to repair a few queens.
+    """
+    board = list(range(n))
+    counters = DiagonalCounters(n)
+
+    for column in range(n):
+        for _ in range(placement_attempts):
+            j = rng.randrange(column, n)
+            if counters.is_free(column, board[j]):
+                break
+        board[column], board[j] = board[j], board[column]
+        counters.add(column, board[column])
+
+    return board
+
+
+def min_conflicts(n: int,
+                  max_steps: int = default_max_steps,
+                  swap_candidates: int = default_swap_candidates,
+                  rng: Rng = random) -> PermutationBoard | None:
+    """
+    Solve n-queens with min-conflicts hill climbing. Each step picks a random attacked queen, tries
+    swap_candidates random columns to swap rows with and makes the swap which leaves the fewest
+    conflicts, as long as it does not add any. Sideways moves let the search walk along plateaus,
+    and if the number of conflicts has not dropped for a while the board is rebuilt from scratch.
+    Return the solved board, or None if it is not solved within max_steps.
+    """
+    # Small boards have many local minima, so they are restarted sooner
+    restart_limit = max(100, 10 * n)
+
+    board = greedy_permutation(n, rng=rng)
+    counters = DiagonalCounters.from_board(board)
+    attacked = [column for column in range(n) if counters.attackers(column, board[column]) > 0]
+    # The columns in attacked, so none is added twice, which would make it more likely to be picked
+    listed = set(attacked)
+    conflicts = -fitness_fn_diagonal(tuple(board))
+    fewest_conflicts, steps_since_improvement = conflicts, 0
+
+    for _ in range(max_steps):
+        if not attacked:
+            # The list is refreshed lazily, so a full rescan is needed to be sure the board is solved
+            attacked = [column for column in range(n) if counters.attackers(column, board[column]) > 0]
+            listed = set(attacked)
+            if not attacked:
+                return PermutationBoard(tuple(board))
+
+        if steps_since_improvement > restart_limit:
+            board = greedy_permutation(n, rng=rng)
+            counters = DiagonalCounters.from_board(board)
+            attacked = [column for column in range(n) if counters.attackers(column, board[column]) > 0]
+            listed = set(attacked)
+            conflicts = -fitness_fn_diagonal(tuple(board))
+            fewest_conflicts, steps_since_improvement = conflicts, 0
+            continue
+
+        index = rng.randrange(len(attacked))
+        i = attacked[index]
+        if counters.attackers(i, board[i]) == 0:
+            # Solved since it was added, remove it by moving the last element into its place
+            attacked[index] = attacked[-1]
+            attacked.pop()
+            listed.discard(i)
+            continue
+
+        steps_since_improvement += 1
+        best_j, best_delta = None, 1
+        for _ in range(swap_candidates):
+            j = rng.randrange(n)
+            if j == i:
+                continue
+            delta = counters.swap_delta(board, i, j)
+            if delta < best_delta:
+                best_j, best_delta = j, delta
+
+        if best_j is not None:
+            counters.swap(board, i, best_j)
+            conflicts += best_delta
+            if counters.attackers(best_j, board[best_j]) > 0 and best_j not in listed:
+                attacked.append(best_j)
+                listed.add(best_j)
+            if conflicts < fewest_conflicts:
+                fewest_conflicts, steps_since_improvement = conflicts, 0
+
+    return None
+
+
+def exponential_schedule(initial_temperature: float = 2.0, alpha: float = 0.999) -> Schedule:
+    """T(step) = T0 * alpha^step"""
+    return lambda step: initial_temperature * alpha ** step
+
+
+def linear_schedule(initial_temperature: float = 2.0, num_of_steps: int = 10_000) -> Schedule:
+    """T(step) falls linearly from T0 to 0 after num_of_steps steps"""
+    return lambda step: initial_temperature * max(0.0, 1 - step / num_of_steps)
+
+
+def logarithmic_schedule(initial_temperature: float = 2.0) -> Schedule:
+    """T(step) = T0 / ln(step + 2), slow but with a guarantee to converge given enough steps"""
+    return lambda step: initial_temperature / math.log(step + 2)
+
+
+def simulated_annealing(individual: Individual,
+                        minimal_fitness: float,
+                        schedule: Schedule = exponential_schedule(),
+                        max_steps: int = default_max_steps,
+                        rng: Rng = random) -> Individual:
+    """
+    Simulated annealing over the Individual interface: the neighbour of an individual is
+    individual.mutate(). A neighbour that is not worse is always accepted, a worse one with probability
+    exp(delta / T). Stops when minimal_fitness is reached, the temperature drops to 0 or after
+    max_steps, and returns the fittest individual seen.
+    """
+    current = individual
+    fittest = individual
+
+    for step in range(max_steps):
+        if minimal_fitness <= fittest.evaluate():
+            break
+
+        temperature = schedule(step)
+        if temperature <= 0:
+            break
+
+        neighbour = current.mutate(rng)
+        delta = neighbour.evaluate() - current.evaluate()
+        if delta >= 0 or rng.random() < math.exp(delta / temperature):
+            current = neighbour
+            if fittest < current:
+                fittest = current
+
+    return fittest
+
+
+def time_to_solution(search: Callable[[], Individual | None]) -> tuple[float, bool]:
+    """Run search and return the elapsed time in ms and whether it found a board without conflicts"""
+    start_time = time.perf_counter_ns()
+    result = search()
+    elapsed_time = (time.perf_counter_ns() - start_time) / 10 ** 6
+    return elapsed_time, result is not None and fitness_fn_diagonal(result.board) == 0
+
+
+def benchmark(sizes: tuple[int, ...] = (8, 16, 24), repeats: int = 5) -> None:
+    """Print the median time to solution and success rate of the GA, SA and min-conflicts per board size"""
+    population_size = 50
+
+    for n in sizes:
+        engines: dict[str, Callable[[], Individual | None]] = {
+            "genetic_algorithm": lambda: genetic_algorithm(get_initial_population(n, population_size), 0,
+                                                           num_of_generations=1000,
+                                                           should_trim_population=True,
+                                                           population_size=population_size,
+                                                           selection="tournament"),
+            "simulated_annealing": lambda: simulated_annealing(PermutationBoard.create_random(n), 0,
+                                                               max_steps=100_000),
+            "min_conflicts": lambda: min_conflicts(n),
+        }
+
+        for name, search in engines.items():
+            runs = [time_to_solution(search) for _ in range(repeats)]
+            times = sorted(elapsed_time for elapsed_time, _ in runs)
+            solved = sum(success for _, success in runs)
+            print(f"n = {n:>3} {name:<20} median {times[len(times) // 2]:>10.2f} ms, solved {solved}/{repeats}")
+
+
+def main():
+    benchmark()
+
+    # Only min-conflicts scales to very large boards
+    n = 100_000
+    start_time = time.perf_counter_ns()
+    board = min_conflicts(n)
+    elapsed_time = (time.perf_counter_ns() - start_time) / 10 ** 6
+    if board is None:
+        print(f"\nmin_conflicts did not solve n = {n} within {default_max_steps} steps ({elapsed_time:.0f} ms)")
+    else:
+        print(f"\nmin_conflicts solved n = {n} in {elapsed_time:.0f} ms, fitness {fitness_fn_diagonal(board.board)}")
+
+    # Cross-check against the pairwise fitness function on a board small enough for it
+    board = min_conflicts(200)
+    if board is None:
+        print(f"min_conflicts did not solve n = 200 within {default_max_steps} steps")
+    else:
+        print(f"Pairwise check for n = 200: fitness {fitness_fn_negative(board.board)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,14 @@
 import random
 from typing import Self
 
+from ga import Individual, Rng, make_rng, sample_distinct
+
+# Print every mutation and crossover
+verbose = False
+# Up to this size distinct boards are sampled as numbers below n^n and decoded; larger boards are
+# drawn column by column, since decoding numbers with n log n bits gets slow
+max_decoded_board_size = 256
+
 """
 Fitness utility: number of conflicting pairs (we minimize this, so fitness = -conflicts)
 """
@@ -21,26 +29,26 @@ def fitness_fn_negative(board_view: tuple[int, ...]) -> int:
 
 
 """
-Abstract base class for individuals in a genetic algorithm
+Same number of conflicting pairs in O(n) instead of O(n^2)
 """
-class Individual:
-    def get_fitness(self) -> float:
-        """Return the fitness of the individual"""
-        raise NotImplementedError
-
-    def mutate(self) -> Self:
-        """Return a mutated version of the individual"""
-        raise NotImplementedError
-
-    def reproduce(self, other: Self) -> Self:
-        """Return a new individual from crossover with another"""
-        raise NotImplementedError
-
-    def __lt__(self, other: Self) -> bool:
-        return self.get_fitness() < other.get_fitness()
+def fitness_fn_counting(board_view: tuple[int, ...]) -> int:
+    """
+    Count the queens in every row and on every diagonal; a line with k queens holds k * (k - 1) / 2
+    conflicting pairs. Gives the same result as fitness_fn_negative.
+    """
+    n = len(board_view)
+    rows = [0] * n
+    rising = [0] * (2 * n - 1)
+    falling = [0] * (2 * n - 1)
+    for column, row in enumerate(board_view):
+        rows[row] += 1
+        rising[column + row] += 1
+        falling[column - row + n - 1] += 1
 
-    def __repr__(self):
-        return f"Fitness: {self.get_fitness()}"
+    conflicts = 0
+    for count in rows + rising + falling:
+        conflicts += count * (count - 1) // 2
+    return -conflicts
 
 
 """
@@ -52,58 +60,89 @@ class Board(Individual):
         self.board = board
 
     def get_fitness(self) -> float:
-        """Use fitness function from queens_fitness to compute fitness"""
-        return fitness_fn_negative(self.board)
+        """Use the O(n) counting version of the fitness function from queens_fitness"""
+        return fitness_fn_counting(self.board)
 
-    def mutate(self) -> Self:
+    def mutate(self, rng: Rng = random) -> Self:
         """
         Randomly change the row of one queen (one column)
         """
         board_list = list(self.board)
-        index = random.randint(0, len(board_list) - 1)
-        board_list[index] = random.randint(0, len(board_list) - 1)
+        index = rng.randint(0, len(board_list) - 1)
+        board_list[index] = rng.randint(0, len(board_list) - 1)
         mutated = Board(tuple(board_list))
-        print(f"  Mutate: {self.board} -> {mutated.board}")
+        if verbose:
+            print(f"  Mutate: {self.board} -> {mutated.board}")
         return mutated
 
-    def reproduce(self, other: Self) -> Self:
+    def reproduce(self, other: Self, rng: Rng = random) -> Self:
         """
         Reproduce with another board using one-point crossover
         """
-        crossover_point = random.randint(1, len(self.board) - 2)
+        crossover_point = rng.randint(1, len(self.board) - 2)
         child_board = self.board[:crossover_point] + other.board[crossover_point:]
         child = Board(child_board)
-        print(f"  Reproduce: {self.board} x {other.board} @ {crossover_point} -> {child.board}")
+        if verbose:
+            print(f"  Reproduce: {self.board} x {other.board} @ {crossover_point} -> {child.board}")
         return child
 
+    def genes(self) -> tuple[int, ...]:
+        return self.board
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self.board == other.board
+
     def __hash__(self):
         return hash(self.board)
 
     def __repr__(self):
-        return f"Board: {self.board}, Fitness: {self.get_fitness()}"
+        return f"Board: {self.board}, Fitness: {self.evaluate()}"
 
 
 """
 Generate an initial population of random boards
 """
-def get_initial_population(n: int, count: int) -> set[Board]:
+def get_initial_population(n: int, count: int, rng: Rng = random) -> set[Board]:
     """
     Generate a set of unique board individuals with random queen placements
     """
-    population: set[Board] = set()
+    return {Board(board) for board in random_board_matrix(n, count, rng)}
 
-    while len(population) < count:
-        board = tuple(random.randint(0, n - 1) for _ in range(n))
-        population.add(Board(board))
 
-    return population
+def random_board_matrix(n: int, count: int, rng: Rng = random) -> list[tuple[int, ...]]:
+    """
+    Return count distinct random boards, one row of the matrix per board.
+    For small boards count distinct numbers below n^n are sampled and written in base n, so count can be
+    as large as n^n without any retries. For larger boards two random boards are practically never
+    equal (the chance is count^2 / n^n), so they are drawn directly and only checked for duplicates.
+    """
+    if count > n ** n:
+        raise ValueError(f"There are only {n ** n} boards of size {n}")
+
+    if n > max_decoded_board_size:
+        rows = range(n)
+        boards: dict[tuple[int, ...], None] = {}
+        while len(boards) < count:
+            boards[tuple(rng.choices(rows, k=n))] = None
+        return list(boards)
+
+    matrix = []
+    for number in sample_distinct(n ** n, count, rng):
+        board = []
+        for _ in range(n):
+            number, row = divmod(number, n)
+            board.append(row)
+        matrix.append(tuple(board))
+    return matrix
 
 
 """
 Pick one individual using roulette wheel selection
 """
-def pick_individual(totals: list[float], population: list[Individual]) -> Individual:
-    r = random.uniform(0, 1)
+def pick_individual(totals: list[float], population: list[Individual], rng: Rng = random) -> Individual:
+    r = rng.uniform(0, 1)
     total_fitness = totals[-1]
     for i, individual in enumerate(population):
         if r < totals[i] / total_fitness:
@@ -114,18 +153,18 @@ def pick_individual(totals: list[float], population: list[Individual]) -> Indivi
 """
 Select two individuals based on fitness proportionate selection
 """
-def random_selection(population: set[Individual]) -> tuple[Individual, Individual]:
+def random_selection(population: set[Individual], rng: Rng = random) -> tuple[Individual, Individual]:
     ordered = list(population)
     totals = []
     total = 0
 
     for ind in ordered:
-        fitness = ind.get_fitness()
+        fitness = ind.evaluate()
         total += fitness
         totals.append(total)
 
-    mother = pick_individual(totals, ordered)
-    father = pick_individual(totals, ordered)
+    mother = pick_individual(totals, ordered, rng)
+    father = pick_individual(totals, ordered, rng)
     return mother, father
 
 
@@ -165,22 +204,27 @@ def genetic_algorithm(population: set[Individual],
                       num_of_generations: int = 100,
                       should_trim_population: bool = True,
                       p_mutation: float = 0.8,
-                      max_population_size: int = 100) -> Individual | None:
+                      max_population_size: int = 100,
+                      seed: int | None = None) -> Individual | None:
     """
     Evolve population toward a minimal conflict state (maximized fitness = 0)
+    With a seed, generation g draws its random numbers from make_rng(seed, g), so the run can be repeated
+    Nothing is printed unless verbose is set, like for mutate and reproduce
     """
     for generation in range(num_of_generations):
-        print(f"\nGeneration {generation}")
-        print_population(population)
+        if verbose:
+            print(f"\nGeneration {generation}")
+            print_population(population)
 
+        rng = random if seed is None else make_rng(seed, generation)
         new_population = set()
 
         for _ in range(len(population)):
-            mother, father = random_selection(population)
-            child = mother.reproduce(father)
+            mother, father = random_selection(population, rng)
+            child = mother.reproduce(father, rng)
 
-            if random.random() < p_mutation:
-                child = child.mutate()
+            if rng.random() < p_mutation:
+                child = child.mutate(rng)
 
             new_population.add(child)
 
@@ -190,12 +234,14 @@ def genetic_algorithm(population: set[Individual],
             population = trim_population(population, max_population_size)
 
         fittest = get_fittest_individual(population)
-        if fittest.get_fitness() >= minimal_fitness:
-            print("\nTerminating early — fitness target reached.")
+        if fittest.evaluate() >= minimal_fitness:
+            if verbose:
+                print("\nTerminating early — fitness target reached.")
             break
 
-    print(f"\nFinal Generation {generation}")
-    print_population(population)
+    if verbose:
+        print(f"\nFinal Generation {generation}")
+        print_population(population)
     return get_fittest_individual(population)
 
 
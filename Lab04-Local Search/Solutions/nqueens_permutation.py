@@ -0,0 +1,238 @@
+import math
+import random
+from collections.abc import Callable
+from typing import Self
+
+from ga import Individual, Rng, genetic_algorithm, sample_distinct
+
+# Permutation encoding of N-Queens: board[column] is the row of the queen in that column and every row
+# is used exactly once. Two queens can then never share a row or a column, so the search space shrinks
+# from n^n to n! boards and only diagonal conflicts are left to count.
+
+type Permutation = tuple[int, ...]
+
+# Up to this size distinct permutations are sampled as numbers below n! and decoded from their rank
+max_ranked_permutation_size = 20
+
+
+def fitness_fn_diagonal(board_view: Permutation) -> int:
+    """
+    Compute the number of queen pairs sharing a diagonal, negated, in O(n).
+    Queens (c1, r1) and (c2, r2) share a diagonal when c1 + r1 == c2 + r2 or c1 - r1 == c2 - r2,
+    so counting the queens per diagonal gives the pairs as k * (k - 1) / 2 for every diagonal with k queens.
+    """
+    n = len(board_view)
+    rising = [0] * (2 * n - 1)
+    falling = [0] * (2 * n - 1)
+    for column, row in enumerate(board_view):
+        rising[column + row] += 1
+        falling[column - row + n - 1] += 1
+
+    conflicts = 0
+    for count in rising + falling:
+        conflicts += count * (count - 1) // 2
+    return -conflicts
+
+
+def random_cut_points(n: int, rng: Rng = random) -> tuple[int, int]:
+    """Return two cut points 0 <= a < b <= n delimiting the segment copied from the first parent"""
+    a, b = sorted(rng.sample(range(n + 1), 2))
+    return a, b
+
+
+def pmx_crossover(mother: Permutation, father: Permutation, rng: Rng = random) -> Permutation:
+    """
+    Partially mapped crossover. The child takes a segment from the mother. The rest is copied from the
+    father, except genes already in the segment, which are replaced by following the mapping
+    segment position -> mother gene -> position of that gene in the father.
+    """
+    n = len(mother)
+    a, b = random_cut_points(n, rng)
+    child: list[int | None] = [None] * n
+    child[a:b] = mother[a:b]
+    segment = set(mother[a:b])
+    position_in_father = {gene: i for i, gene in enumerate(father)}
+
+    for i in range(a, b):
+        gene = father[i]
+        if gene in segment:
+            continue
+        j = i
+        while a <= j < b:
+            j = position_in_father[mother[j]]
+        child[j] = gene
+
+    for i in range(n):
+        if child[i] is None:
+            child[i] = father[i]
+
+    return tuple(child)
+
+
+def order_crossover(mother: Permutation, father: Permutation, rng: Rng = random) -> Permutation:
+    """
+    Order crossover (OX). The child takes a segment from the mother, and the remaining positions are
+    filled, starting after the segment and wrapping around, with the father's genes in the order they
+    appear in the father after the segment.
+    """
+    n = len(mother)
+    a, b = random_cut_points(n, rng)
+    segment = set(mother[a:b])
+    child: list[int | None] = [None] * n
+    child[a:b] = mother[a:b]
+
+    remaining = [father[(b + i) % n] for i in range(n) if father[(b + i) % n] not in segment]
+    for i, gene in enumerate(remaining):
+        child[(b + i) % n] = gene
+
+    return tuple(child)
+
+
+def cycle_crossover(mother: Permutation, father: Permutation, rng: Rng = random) -> Permutation:
+    """
+    Cycle crossover (CX). The positions are split into cycles (position -> father gene -> position of
+    that gene in the mother -> ...) and the child takes the genes of every other cycle from the mother
+    and the rest from the father, so every gene keeps the position it has in one of the parents.
+    Cycle crossover is deterministic, rng is only there to match the other operators.
+    """
+    n = len(mother)
+    position_in_mother = {gene: i for i, gene in enumerate(mother)}
+    child: list[int | None] = [None] * n
+    from_mother = True
+
+    for start in range(n):
+        if child[start] is not None:
+            continue
+        i = start
+        while child[i] is None:
+            child[i] = mother[i] if from_mother else father[i]
+            i = position_in_mother[father[i]]
+        from_mother = not from_mother
+
+    return tuple(child)
+
+
+def swap_mutation(board: Permutation, rng: Rng = random) -> Permutation:
+    """Swap the rows of two random columns"""
+    i, j = rng.sample(range(len(board)), 2)
+    board_list = list(board)
+    board_list[i], board_list[j] = board_list[j], board_list[i]
+    return tuple(board_list)
+
+
+def inversion_mutation(board: Permutation, rng: Rng = random) -> Permutation:
+    """Reverse the rows of a random segment of columns"""
+    a, b = random_cut_points(len(board), rng)
+    return board[:a] + board[a:b][::-1] + board[b:]
+
+
+crossover_operators: dict[str, Callable[[Permutation, Permutation, Rng], Permutation]] = {
+    "pmx": pmx_crossover,
+    "ox": order_crossover,
+    "cycle": cycle_crossover,
+}
+
+mutation_operators: dict[str, Callable[[Permutation, Rng], Permutation]] = {
+    "swap": swap_mutation,
+    "inversion": inversion_mutation,
+}
+
+
+class PermutationBoard(Individual):
+    """
+    An N-Queens board in permutation encoding. The crossover and mutation operators are chosen by
+    name from crossover_operators and mutation_operators and are inherited by the children.
+    """
+
+    def __init__(self, board: Permutation, crossover: str = "ox", mutation: str = "swap"):
+        self.board = board
+        self.crossover = crossover
+        self.mutation = mutation
+
+    def get_fitness(self) -> float:
+        return fitness_fn_diagonal(self.board)
+
+    def mutate(self, rng: Rng = random) -> Self:
+        mutated = mutation_operators[self.mutation](self.board, rng)
+        return PermutationBoard(mutated, self.crossover, self.mutation)
+
+    def reproduce(self, other: Self, rng: Rng = random) -> Self:
+        child = crossover_operators[self.crossover](self.board, other.board, rng)
+        return PermutationBoard(child, self.crossover, self.mutation)
+
+    def genes(self) -> tuple[int, ...]:
+        return self.board
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PermutationBoard):
+            return NotImplemented
+        return self.board == other.board
+
+    def __hash__(self):
+        return hash(self.board)
+
+    def __repr__(self):
+        return f"Board: {self.board}, Fitness: {self.evaluate()}"
+
+    @classmethod
+    def create_random(cls, n: int, crossover: str = "ox", mutation: str = "swap", rng: Rng = random) -> Self:
+        board = list(range(n))
+        rng.shuffle(board)
+        return cls(tuple(board), crossover, mutation)
+
+
+def permutation_from_rank(rank: int, n: int) -> Permutation:
+    """
+    Decode a number 0 <= rank < n! into a permutation of range(n) through its Lehmer code: the digits of
+    rank in the factorial number system say which of the unused values comes next.
+    """
+    digits = []
+    for base in range(1, n + 1):
+        rank, digit = divmod(rank, base)
+        digits.append(digit)
+
+    unused = list(range(n))
+    return tuple(unused.pop(digit) for digit in reversed(digits))
+
+
+def random_permutation_matrix(n: int, count: int, rng: Rng = random) -> list[Permutation]:
+    """
+    Return count distinct random permutations of range(n), one row of the matrix per permutation.
+    Small n sample count distinct ranks below n! and decode them, so count can be as large as n!.
+    For larger n two shuffles are practically never equal, so they are only checked for duplicates.
+    """
+    if n <= max_ranked_permutation_size:
+        return [permutation_from_rank(rank, n) for rank in sample_distinct(math.factorial(n), count, rng)]
+
+    permutations: dict[Permutation, None] = {}
+    board = list(range(n))
+    while len(permutations) < count:
+        rng.shuffle(board)
+        permutations[tuple(board)] = None
+    return list(permutations)
+
+
+def get_initial_population(n: int, count: int, crossover: str = "ox", mutation: str = "swap",
+                           rng: Rng = random) -> set[PermutationBoard]:
+    """
+    Generate count distinct random permutation boards
+    """
+    return {PermutationBoard(board, crossover, mutation) for board in random_permutation_matrix(n, count, rng)}
+
+
+def main():
+    n = 16
+    population_size = 50
+    target_fitness = 0
+
+    for crossover in crossover_operators:
+        initial_population = get_initial_population(n, population_size, crossover, "swap")
+        fittest = genetic_algorithm(initial_population, target_fitness, num_of_generations=100,
+                                    should_trim_population=True, population_size=population_size,
+                                    selection="tournament")
+        print(f"\nBest solution found with {crossover} crossover:")
+        print(fittest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+import random
+from collections.abc import Iterable, Sequence
+from concurrent.futures import Executor
+
+from ga import (Individual, Population, Rng, default_chunk_size, default_num_of_generations, default_p_mutation,
+                evaluate_population, make_rng)
+from Number import NumberIndividual, get_initial_population
+
+# NSGA-II for individuals with several objectives. It works with the Individual interface from ga.py,
+# except that get_fitness returns a tuple with one value per objective instead of a single number.
+# Every objective is maximized, like the fitness in genetic_algorithm. mutate and reproduce are used
+# unchanged, only selection and replacement differ:
+# - the population is split into fronts: front 0 holds the individuals no other individual dominates,
+#   front 1 those only dominated by front 0, and so on,
+# - within a front, individuals in sparsely populated parts of the front (large crowding distance) are
+#   preferred, which spreads the population along the trade-off between the objectives.
+
+type Objectives = tuple[float, ...]
+
+default_tournament_size = 2
+
+
+def dominates(a: Objectives, b: Objectives) -> bool:
+    """a dominates b if it is at least as good in every objective and better in at least one"""
+    return all(x >= y for x, y in zip(a, b)) and a != b
+
+
+def fast_non_dominated_sort(objectives: Sequence[Objectives]) -> list[list[int]]:
+    """
+    Split the indices of objectives into Pareto fronts, best front first, in O(M N^2) for N vectors of
+    M objectives. Every pair is compared once; each index records which indices it dominates and by how
+    many it is dominated, and the fronts are peeled off by counting the domination counts down.
+    """
+    n = len(objectives)
+    dominated_by: list[list[int]] = [[] for _ in range(n)]
+    domination_count = [0] * n
+
+    for i in range(n):
+        a = objectives[i]
+        for j in range(i + 1, n):
+            b = objectives[j]
+            if dominates(a, b):
+                dominated_by[i].append(j)
+                domination_count[j] += 1
+            elif dominates(b, a):
+                dominated_by[j].append(i)
+                domination_count[i] += 1
+
+    fronts = []
+    front = [i for i in range(n) if domination_count[i] == 0]
+    while front:
+        fronts.append(front)
+        next_front = []
+        for i in front:
+            for j in dominated_by[i]:
+                domination_count[j] -= 1
+                if domination_count[j] == 0:
+                    next_front.append(j)
+        front = next_front
+
+    return fronts
+
+
+def crowding_distance(objectives: Sequence[Objectives], front: list[int]) -> dict[int, float]:
+    """
+    Return the crowding distance of every index in front: the sum over the objectives of the distance
+    between its two neighbours along that objective, scaled by the range of the objective in the front.
+    The extremes of every objective get an infinite distance so they are always kept.
+    """
+    distance = {i: 0.0 for i in front}
+    if len(front) <= 2:
+        return {i: float("inf") for i in front}
+
+    for m in range(len(objectives[front[0]])):
+        ordered = sorted(front, key=lambda i: objectives[i][m])
+        lowest, highest = objectives[ordered[0]][m], objectives[ordered[-1]][m]
+        distance[ordered[0]] = distance[ordered[-1]] = float("inf")
+        if highest == lowest:
+            continue
+        for previous, i, following in zip(ordered, ordered[1:], ordered[2:]):
+            distance[i] += (objectives[following][m] - objectives[previous][m]) / (highest - lowest)
+
+    return distance
+
+
+def rank_population(population: Population) -> tuple[list[list[int]], list[int], list[float]]:
+    """Return the fronts, the front number and the crowding distance of every individual"""
+    objectives = [individual.evaluate() for individual in population]
+    fronts = fast_non_dominated_sort(objectives)
+    ranks = [0] * len(population)
+    distances = [0.0] * len(population)
+
+    for rank, front in enumerate(fronts):
+        for i, distance in crowding_distance(objectives, front).items():
+            ranks[i] = rank
+            distances[i] = distance
+
+    return fronts, ranks, distances
+
+
+def crowded_tournament(ranks: list[int], distances: list[float], tournament_size: int, rng: Rng) -> int:
+    """Index of the winner of a tournament between random individuals: lowest front, then most isolated"""
+    contestants = [rng.randrange(len(ranks)) for _ in range(tournament_size)]
+    return min(contestants, key=lambda i: (ranks[i], -distances[i]))
+
+
+def select_survivors(candidates: Population, population_size: int) -> tuple[Population, list[int], list[float]]:
+    """
+    Fill the next generation front by front. The first front that does not fit completely is cut,
+    keeping its individuals with the largest crowding distance.
+    Return the survivors with their front numbers and crowding distances, as rank_population would. Cutting
+    the last front removes no individual that dominates a survivor, so the fronts stay the same, and the
+    distances are those within the whole front, as in the crowded tournaments of NSGA-II.
+    """
+    objectives = [individual.evaluate() for individual in candidates]
+    survivors: Population = []
+    ranks: list[int] = []
+    distances: list[float] = []
+
+    for rank, front in enumerate(fast_non_dominated_sort(objectives)):
+        distance = crowding_distance(objectives, front)
+        if len(survivors) + len(front) > population_size:
+            front = sorted(front, key=lambda i: distance[i], reverse=True)[:population_size - len(survivors)]
+        survivors.extend(candidates[i] for i in front)
+        ranks.extend(rank for _ in front)
+        distances.extend(distance[i] for i in front)
+        if len(survivors) == population_size:
+            break
+
+    return survivors, ranks, distances
+
+
+def nsga2(population: Iterable[Individual],
+          num_of_generations: int = default_num_of_generations,
+          population_size: int | None = None,
+          p_mutation: float = default_p_mutation,
+          executor: Executor | None = None,
+          chunk_size: int = default_chunk_size,
+          tournament_size: int = default_tournament_size,
+          seed: int | None = None) -> Population:
+    """
+    Evolve a population of individuals whose get_fitness returns a tuple of objectives, all maximized,
+    and return the Pareto front of the final population (the individuals no other one dominates).
+
+    Each generation creates as many children as there are parents, with parents picked by crowded
+    tournaments, reproduce and, with probability p_mutation, mutate. Parents and children then compete
+    together for the population_size places (default: the size of the initial population), ordered by
+    front and crowding distance.
+    Fitness evaluation can be spread over an executor as in genetic_algorithm, and with a seed generation g
+    draws its random numbers from make_rng(seed, g).
+    """
+    population = list(population)
+    population_size = population_size or len(population)
+    evaluate_population(population, executor, chunk_size)
+    # Later generations take the ranks from select_survivors instead of sorting the survivors again
+    _, ranks, distances = rank_population(population)
+
+    for generation in range(num_of_generations):
+        rng = random if seed is None else make_rng(seed, generation)
+
+        offspring: Population = []
+        for _ in range(len(population)):
+            mother = population[crowded_tournament(ranks, distances, tournament_size, rng)]
+            father = population[crowded_tournament(ranks, distances, tournament_size, rng)]
+            child = mother.reproduce(father, rng)
+            if rng.uniform(0, 1) < p_mutation:
+                child = child.mutate(rng)
+            offspring.append(child)
+
+        evaluate_population(offspring, executor, chunk_size)
+        population, ranks, distances = select_survivors(population + offspring, population_size)
+
+    return [individual for individual, rank in zip(population, ranks) if rank == 0]
+
+
+class TradeOffNumber(NumberIndividual):
+    """
+    Example with two conflicting objectives: the value of the number and the number of zero bits in it.
+    The Pareto front is the numbers made of some ones followed by zeros, like 11100000.
+    """
+
+    def get_fitness(self) -> Objectives:
+        return self.gene, self.length - self.gene.bit_count()
+
+
+def main():
+    n = 8
+    population = [TradeOffNumber(individual.gene, n) for individual in get_initial_population(n, 20)]
+
+    front = nsga2(population, num_of_generations=50, seed=1)
+
+    # Like genetic_algorithm with allow_duplicates, NSGA-II keeps copies of an individual, print each gene once
+    genes = sorted({individual.gene for individual in front})
+    print(f"Pareto front (value, zero bits) of {len(front)} individuals:")
+    for gene in genes:
+        print(f"  {gene:0{n}b}: {TradeOffNumber(gene, n).evaluate()}")
+
+
+if __name__ == '__main__':
+    main()
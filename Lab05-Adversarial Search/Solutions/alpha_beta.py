@@ -1,44 +1,276 @@
-from collections.abc import Iterable
-from typing import Callable
+import bisect
+import functools
+import os
+import time
+from array import array
+from dataclasses import dataclass
+
+from search_common import EXACT, LOWER_BOUND, UPPER_BOUND, SearchTimeout
 
 # This is based on the game Nim, where each player must in turn select a pile to split.
 # The result of the split must be 2 piles of different sizes
 # I dont like this Nim variant, the actual Nim is better.
 
 type Piles = list[int]
+# Canonical form of a position for the transposition table: the piles that can still be split, sorted.
+# Piles of 1 or 2 stones can never be split again and the order of the piles does not matter,
+# so [7, 5, 3], [3, 5, 7] and [1, 3, 5, 2, 7] are all the same position (3, 5, 7).
+# Two equal piles are dropped as well: whatever one player does to one of them, the other can copy on
+# the other one, so they never change who wins, and (3, 5, 5, 7) is the position (3, 7).
+type Position = tuple[int, ...]
+
+# The utility of every finished game
+lowest_utility, highest_utility = -1, +1
+
+# (position, MAX to move) -> (value, kind). Kept between moves: values do not depend on the window
+# they were found with, only on the position and the side to move.
+transposition_table: dict[tuple[Position, bool], tuple[int, int]] = {}
+
+# How the computer picks its move: "grundy" uses the Sprague-Grundy values, "alpha_beta" searches the tree,
+# "iterative_deepening" searches the tree for at most default_time_limit seconds
+solver_mode = "grundy"
+default_time_limit = 1.0
+# Nodes searched between two looks at the clock
+nodes_per_time_check = 1024
+# Grundy values are computed for all pile sizes up to at least this and cached in grundy_cache_path
+default_grundy_limit = 1000
+grundy_cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grundy_values.bin")
 
 
 def alpha_beta_decision(state: Piles) -> list[int]:
-    infinity = float('inf')
-
-    def max_value(state_option: Piles, alpha: float, beta: float) -> int:
-        if is_terminal(state_option):
-            return utility_of(state_option)
-        expected_value = -infinity
-        for successor in successors_of(state_option):
-            expected_value = max(expected_value, min_value(successor, alpha, beta))
+    """
+    Return the state resulting from the best move for MAX (the computer) in state.
+    Positions are looked up in transposition_table in canonical form, so every multiset of piles
+    is searched once per side to move instead of once per order the piles can be reached in.
+    """
+    best_successor, best_value = None, lowest_utility - 1
+    alpha = lowest_utility
+    for successor in successors_of(state):
+        successor_value = position_value(canonical(successor), False, alpha, highest_utility)
+        if best_successor is None or successor_value > best_value:
+            best_successor, best_value = successor, successor_value
+            alpha = max(alpha, successor_value)
+            if alpha >= highest_utility:
+                # A forced win, no other move can do better
+                break
+    return best_successor
+
+
+def position_value(position: Position, max_to_move: bool,
+                   alpha: float = lowest_utility, beta: float = highest_utility) -> int:
+    """
+    Alpha-beta value of a canonical position: +1 if MAX wins, -1 if MIN wins.
+    The utility is always -1 or +1, so the search starts with that window instead of (-inf, inf):
+    a lower bound of +1 or an upper bound of -1 found in a cut-off search is then the exact value.
+    """
+    if not position:
+        # The player to move cannot split any pile, or only pairs of equal piles where the other
+        # player can copy every move, and loses
+        return -1 if max_to_move else +1
+
+    key = (position, max_to_move)
+    entry = transposition_table.get(key)
+    if entry is not None:
+        stored_value, kind = entry
+        if kind == EXACT:
+            return stored_value
+        if kind == LOWER_BOUND:
+            alpha = max(alpha, stored_value)
+        else:
+            beta = min(beta, stored_value)
+        if alpha >= beta:
+            return stored_value
+
+    successors = canonical_successors_of(position)
+    # Enhanced transposition cutoff: a successor already known to be a win for the player to move
+    # decides the position without searching the others
+    winning_value = highest_utility if max_to_move else lowest_utility
+    winning_entries = ((winning_value, EXACT), (winning_value, LOWER_BOUND if max_to_move else UPPER_BOUND))
+    for successor in successors:
+        if transposition_table.get((successor, not max_to_move)) in winning_entries:
+            transposition_table[key] = (winning_value, EXACT)
+            return winning_value
+
+    original_alpha, original_beta = alpha, beta
+    if max_to_move:
+        expected_value = lowest_utility
+        for successor in successors:
+            expected_value = max(expected_value, position_value(successor, False, alpha, beta))
             if expected_value >= beta:
-                return expected_value
+                break
             alpha = max(alpha, expected_value)
-        return expected_value
-
-    def min_value(state_option: Piles, alpha: float, beta: float) -> int:
-        if is_terminal(state_option):
-            return utility_of(state_option)
-        expected_value = infinity
-        for successor in successors_of(state_option):
-            expected_value = min(expected_value, max_value(successor, alpha, beta))
+    else:
+        expected_value = highest_utility
+        for successor in successors:
+            expected_value = min(expected_value, position_value(successor, True, alpha, beta))
             if expected_value <= alpha:
-                return expected_value
+                break
             beta = min(beta, expected_value)
+
+    if expected_value <= original_alpha:
+        kind = UPPER_BOUND
+    elif expected_value >= original_beta:
+        kind = LOWER_BOUND
+    else:
+        kind = EXACT
+    transposition_table[key] = (expected_value, kind)
+    return expected_value
+
+
+@dataclass
+class SearchReport:
+    # Depth of the deepest completed search
+    depth: int
+    nodes: int
+    seconds: float
+    # +1 if MAX wins, -1 if MIN wins, 0 if it is not decided within depth moves
+    value: int
+
+
+def iterative_deepening_decision(state: Piles, time_limit: float = default_time_limit) -> tuple[list[int], SearchReport]:
+    """
+    Return the state after the best move for MAX found within time_limit seconds, and a report of the search.
+    The tree is searched to depth 1, 2, 3, ... moves; positions beyond the depth count as undecided (0).
+    Every iteration searches the principal variation of the previous one first, and the deepest completed
+    iteration gives the move. The search stops early once the value is decided or the depth reaches the
+    longest possible game. Positions solved exactly by alpha_beta_decision are taken from transposition_table.
+    """
+    start_time = time.perf_counter()
+    deadline = None
+    nodes = 0
+    next_time_check = nodes_per_time_check
+    previous_pv: list[Position] = []
+    # (position, MAX to move) -> (depth searched, value, kind), shared by the iterations. A value of -1 or +1
+    # comes from the end of the game, so a decided value holds at any depth.
+    table: dict[tuple[Position, bool], tuple[float, int, int]] = {}
+
+    def value(position: Position, max_to_move: bool, depth: int, ply: int, alpha: float, beta: float,
+              pv: list[Position], on_pv: bool) -> int:
+        nonlocal nodes, next_time_check
+        nodes += 1
+        if deadline is not None and nodes >= next_time_check:
+            next_time_check = nodes + nodes_per_time_check
+            if time.perf_counter() > deadline:
+                raise SearchTimeout()
+
+        if not position:
+            return -1 if max_to_move else +1
+        entry = transposition_table.get((position, max_to_move))
+        if entry in ((+1, EXACT), (-1, EXACT), (+1, LOWER_BOUND), (-1, UPPER_BOUND)):
+            return entry[0]
+        if depth == 0:
+            return 0
+
+        key = (position, max_to_move)
+        entry = table.get(key)
+        if entry is not None and entry[0] >= depth:
+            _, stored_value, kind = entry
+            if kind == EXACT:
+                return stored_value
+            if kind == LOWER_BOUND:
+                alpha = max(alpha, stored_value)
+            else:
+                beta = min(beta, stored_value)
+            if alpha >= beta:
+                return stored_value
+        original_alpha, original_beta = alpha, beta
+
+        successors = canonical_successors_of(position)
+        if on_pv and ply < len(previous_pv) and previous_pv[ply] in successors:
+            successors.remove(previous_pv[ply])
+            successors.insert(0, previous_pv[ply])
+        pv_successor = successors[0] if on_pv and ply < len(previous_pv) else None
+
+        expected_value = None
+        for successor in successors:
+            child_pv: list[Position] = []
+            successor_value = value(successor, not max_to_move, depth - 1, ply + 1, alpha, beta, child_pv,
+                                    successor == pv_successor)
+            if max_to_move:
+                if expected_value is None or successor_value > expected_value:
+                    expected_value = successor_value
+                    if successor_value > alpha:
+                        alpha = successor_value
+                        pv[:] = [successor, *child_pv]
+            else:
+                if expected_value is None or successor_value < expected_value:
+                    expected_value = successor_value
+                    if successor_value < beta:
+                        beta = successor_value
+                        pv[:] = [successor, *child_pv]
+            if alpha >= beta:
+                break
+
+        if expected_value <= original_alpha:
+            kind = UPPER_BOUND
+        elif expected_value >= original_beta:
+            kind = LOWER_BOUND
+        else:
+            kind = EXACT
+        decided = (expected_value == +1 and kind != UPPER_BOUND) or (expected_value == -1 and kind != LOWER_BOUND)
+        table[key] = (float('inf') if decided else depth, expected_value, kind)
         return expected_value
 
-    # Return the state resulting from the best move for MAX
-    best_successor = argmax(
-        successors_of(state),
-        lambda a: min_value(a, -infinity, infinity)
-    )
-    return best_successor
+    best_successor, report = None, SearchReport(0, 0, 0.0, 0)
+    # A split adds a pile, so no game lasts longer than the number of stones
+    for depth in range(1, sum(state) + 1):
+        deadline = start_time + time_limit if depth > 1 else None
+        try:
+            successors = successors_of(state)
+            if previous_pv:
+                successors.sort(key=lambda successor: canonical(successor) != previous_pv[0])
+            alpha, iteration_best, iteration_pv = -1, None, []
+            for successor in successors:
+                child_pv: list[Position] = []
+                position = canonical(successor)
+                successor_value = value(position, False, depth - 1, 1, alpha - 1 if iteration_best is None else alpha,
+                                        +1, child_pv, bool(previous_pv) and position == previous_pv[0])
+                if iteration_best is None or successor_value > alpha:
+                    iteration_best, alpha, iteration_pv = successor, successor_value, [position, *child_pv]
+        except SearchTimeout:
+            break
+        best_successor, previous_pv = iteration_best, iteration_pv
+        report = SearchReport(depth, nodes, time.perf_counter() - start_time, alpha)
+        if alpha != 0 or time.perf_counter() >= start_time + time_limit:
+            break
+
+    report.nodes, report.seconds = nodes, time.perf_counter() - start_time
+    return best_successor, report
+
+
+def canonical(state: Piles) -> Position:
+    """The piles that can still be split, sorted, with pairs of equal piles removed"""
+    unpaired: set[int] = set()
+    for pile in state:
+        if pile > 2:
+            unpaired ^= {pile}
+    return tuple(sorted(unpaired))
+
+
+def canonical_successors_of(position: Position) -> list[Position]:
+    """
+    All positions reachable with one split, in canonical form.
+    """
+    result = []
+    for i, pile in enumerate(position):
+        rest = position[:i] + position[i + 1:]
+        for small in range(1, (pile + 1) // 2):
+            result.append(add_piles(rest, (small, pile - small)))
+    return result
+
+
+def add_piles(position: Position, piles: tuple[int, ...]) -> Position:
+    """Add piles to a canonical position, keeping it sorted and free of pairs"""
+    result = list(position)
+    for pile in piles:
+        if pile <= 2:
+            continue
+        i = bisect.bisect_left(result, pile)
+        if i < len(result) and result[i] == pile:
+            del result[i]
+        else:
+            result.insert(i, pile)
+    return tuple(result)
 
 
 def is_terminal(state: Piles) -> bool:
@@ -50,17 +282,15 @@ def is_terminal(state: Piles) -> bool:
 
 def utility_of(state: Piles) -> int:
     """
-    Returns +1 if MIN wins, -1 if MAX wins.
-    The player (MIN) moves first.
-    If the game ends on MAX's turn, MIN wins (+1).
-    If the game ends on MIN's turn, MAX wins (-1).
+    Returns +1 if MAX (the computer) wins, -1 if MIN (the player) wins, for a game that started
+    from a single pile. The player (MIN) moves first, and the player who cannot split a pile loses.
     """
     # Count of moves made from initial state to now determines whose turn it would have been
     total_moves = count_moves_to_terminal(state)
     if total_moves % 2 == 0:
-        return -1  # MAX just played — MIN would have no move
+        return +1  # MAX just played — MIN has no move
     else:
-        return +1  # MIN just played — MAX would have no move
+        return -1  # MIN just played — MAX has no move
 
 
 def count_moves_to_terminal(state: Piles) -> int:
@@ -96,11 +326,79 @@ def split_pile_options(pile: int) -> list[Piles]:
     return options
 
 
-def argmax(iterable: Iterable, func: Callable[[Piles], int]):
-    return max(iterable, key=func)
+def compute_grundy_values(limit: int, known: array | None = None) -> array:
+    """
+    Return the Grundy values of single piles of 0 to limit stones, in O(limit^2).
+    The Grundy value of a pile is the smallest number that is not the value of a position it can be
+    split into, and the value of two piles is the XOR of their values. Values already in known are
+    kept, so a cached table can be extended.
+    """
+    values = array("H", known if known is not None else [])
+    for pile in range(len(values), limit + 1):
+        reachable = {values[small] ^ values[pile - small] for small in range(1, (pile + 1) // 2)}
+        value = 0
+        while value in reachable:
+            value += 1
+        values.append(value)
+    return values
+
+
+@functools.cache
+def load_grundy_values(limit: int = default_grundy_limit, path: str = grundy_cache_path) -> array:
+    """
+    Return the Grundy values up to limit, read from the cache file at path. A missing or too short
+    cache is computed (extending what is there) and written back.
+    """
+    known = array("H")
+    if os.path.exists(path):
+        with open(path, "rb") as file:
+            known.frombytes(file.read())
+        if len(known) > limit:
+            return known
+
+    values = compute_grundy_values(limit, known)
+    # Write to a temporary file first, so an interrupted run never leaves a truncated cache behind
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        values.tofile(file)
+    os.replace(temporary_path, path)
+    return values
+
+
+def grundy_value(state: Piles, values: array) -> int:
+    """The Grundy value of a position is the XOR of the values of its piles; 0 means the player to move loses"""
+    total = 0
+    for pile in state:
+        total ^= values[pile]
+    return total
+
+
+def grundy_decision(state: Piles, values: array) -> list[int]:
+    """
+    Return the state after a split which leaves a position of Grundy value 0, so the opponent loses
+    with best play, in O(piles * pile size). If there is no such split the position is lost anyway,
+    and the first legal split is played.
+    """
+    total = grundy_value(state, values)
+    first_successor = None
+    for i, pile in enumerate(state):
+        for small in range(1, (pile + 1) // 2):
+            large = pile - small
+            successor = state[:i] + [small, large] + state[i + 1:]
+            if total ^ values[pile] ^ values[small] ^ values[large] == 0:
+                return successor
+            if first_successor is None:
+                first_successor = successor
+    return first_successor
 
 
 def computer_select_pile(state: Piles) -> Piles:
+    if solver_mode == "grundy":
+        return grundy_decision(state, load_grundy_values(max(default_grundy_limit, *state)))
+    if solver_mode == "iterative_deepening":
+        new_state, report = iterative_deepening_decision(state)
+        print(f"    Searched to depth {report.depth}, {report.nodes} nodes in {report.seconds:.3f} s")
+        return new_state
     return alpha_beta_decision(state)
 
 
@@ -159,7 +457,7 @@ def play_nim(initial_state: Piles):
             print("The computer has split a pile")
 
     print("    Final state is {}".format(state))
-    print("    Result: " + ("MIN wins (+1)" if utility_of(state) == 1 else "MAX wins (-1)"))
+    print("    Result: " + ("MAX wins (+1)" if utility_of(state) == 1 else "MIN wins (-1)"))
 
 
 if __name__ == '__main__':
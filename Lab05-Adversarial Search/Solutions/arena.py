@@ -0,0 +1,303 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from breakthrough import BreakthroughSearch, max_search_depth
+from games import DRAW, Game, Move, new_game
+from mcts import MCTS
+from negamax import NegamaxSearch
+
+# Self-play arena: two engine configurations play a match of several games against each other, in a pool of
+# worker processes, and the result is turned into an Elo difference with a confidence interval. Each opening
+# (a few random moves) is played twice with the colours swapped, so neither engine profits from a lucky
+# opening or from moving first. Engines are written as name:key=value,..., for example
+#   alpha_beta:depth=4          BreakthroughSearch to a fixed depth (Breakthrough only)
+#   alpha_beta:time=0.2,tt=off  iterative deepening for 0.2 s per move without the transposition table
+#   negamax:time=0.2            the PVS engine of negamax.py, for every game
+#   mcts:time=0.2               Monte Carlo tree search, or mcts:playouts=2000 for a fixed budget
+#
+# Example:
+#   python arena.py alpha_beta:time=0.1 mcts:time=0.1 --games 20 --output arena.json
+
+# The options each kind of engine understands
+engine_options = {
+    "alpha_beta": {"depth", "time", "tt"},
+    "negamax": {"depth", "time"},
+    "mcts": {"time", "playouts"},
+}
+default_games = 10
+default_opening_plies = 2
+# A game that reaches this many plies is scored as a draw
+default_max_plies = 300
+default_num_of_workers = os.cpu_count() or 1
+default_output = "arena.json"
+# Two-sided 95% confidence
+z_score = 1.96
+score_epsilon = 1e-9
+
+
+@dataclass(frozen=True)
+class EngineConfig:
+    spec: str
+    kind: str
+    depth: int | None = None
+    time_limit: float | None = None
+    table: bool = True
+    playouts: int | None = None
+
+
+@dataclass
+class EngineStats:
+    moves: int = 0
+    # Nodes searched, or rollouts played by MCTS
+    nodes: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class GameRecord:
+    opening: int
+    # Index into the match's engines of the engine playing the first side
+    first_engine: int
+    # 0 or 1 for the engine that won, None for a draw
+    winning_engine: int | None
+    plies: int
+    stats: list[EngineStats] = field(default_factory=list)
+
+
+@dataclass
+class EngineSummary:
+    spec: str
+    nodes_per_second: float
+    seconds_per_move: float
+
+
+@dataclass
+class MatchResult:
+    game: str
+    engines: list[str]
+    games: int
+    wins: int
+    losses: int
+    draws: int
+    # Score of the first engine, a draw counting as half a win
+    score: float
+    # Elo of the first engine relative to the second; a bound is None when it is unbounded
+    elo: float | None
+    elo_low: float | None
+    elo_high: float | None
+    engine_summaries: list[EngineSummary]
+    records: list[GameRecord]
+
+
+def parse_engine(spec: str) -> EngineConfig:
+    """
+    An EngineConfig from a name:key=value,... string, with keys depth, time, tt (on/off) and playouts.
+    Options the engine does not use are rejected, see engine_options.
+    """
+    kind, _, options = spec.partition(":")
+    if kind not in engine_options:
+        raise ValueError(f"Unknown engine {kind!r}, expected one of {', '.join(engine_options)}")
+    settings = dict(option.split("=", 1) for option in options.split(",") if option)
+    unknown = settings.keys() - engine_options[kind]
+    if unknown:
+        raise ValueError(f"{spec}: {kind} does not take {', '.join(sorted(unknown))}, "
+                         f"only {', '.join(sorted(engine_options[kind]))}")
+    config = EngineConfig(spec, kind,
+                          depth=int(settings["depth"]) if "depth" in settings else None,
+                          time_limit=float(settings["time"]) if "time" in settings else None,
+                          table=settings.get("tt", "on") != "off",
+                          playouts=int(settings["playouts"]) if "playouts" in settings else None)
+    if kind == "mcts" and config.time_limit is None and config.playouts is None:
+        raise ValueError(f"{spec}: MCTS needs time or playouts")
+    if kind != "mcts" and config.time_limit is None and config.depth is None:
+        raise ValueError(f"{spec}: alpha-beta needs depth or time")
+    return config
+
+
+def check_engine(config: EngineConfig, game_name: str) -> None:
+    """Raise ValueError if the engine cannot play the game, without building it"""
+    if config.kind == "alpha_beta" and game_name != "breakthrough":
+        raise ValueError("The alpha_beta engine only plays breakthrough, use negamax for the other games")
+
+
+def make_engine(config: EngineConfig, game_name: str):
+    check_engine(config, game_name)
+    if config.kind == "alpha_beta":
+        return BreakthroughSearch() if config.table else BreakthroughSearch(None)
+    if config.kind == "negamax":
+        return NegamaxSearch()
+    return MCTS()
+
+
+def choose_move(config: EngineConfig, engine, game: Game) -> tuple[Move | None, int]:
+    """The move of the engine in game and the nodes (or rollouts) it took"""
+    if config.kind == "mcts":
+        result = engine.search(game, config.time_limit, config.playouts)
+        return result.move, result.playouts
+    if config.time_limit is None:
+        result = engine.search(game, config.depth)
+    else:
+        result = engine.iterative_deepening(game, config.time_limit, config.depth or max_search_depth)
+    return result.move, result.nodes
+
+
+def play_game(game_name: str, nim_piles: list[int] | None, configs: tuple[EngineConfig, EngineConfig],
+              opening: int, first_engine: int, opening_plies: int, max_plies: int) -> GameRecord:
+    """Play one game after opening_plies random moves seeded by opening, engine first_engine moving first"""
+    game = new_game(game_name, nim_piles)
+    rng = random.Random(opening)
+    for _ in range(opening_plies):
+        moves = game.generate_moves()
+        if game.winner() is not None or not moves:
+            break
+        game.play(rng.choice(moves))
+
+    engines = [make_engine(config, game_name) for config in configs]
+    stats = [EngineStats(), EngineStats()]
+    # The engine playing each side; first_engine makes the first move after the opening
+    engine_of_side = {game.to_move: first_engine, 1 - game.to_move: 1 - first_engine}
+
+    winner = game.winner()
+    plies = 0
+    while winner is None and plies < max_plies:
+        index = engine_of_side[game.to_move]
+        start_time = time.perf_counter()
+        move, nodes = choose_move(configs[index], engines[index], game)
+        stats[index].seconds += time.perf_counter() - start_time
+        stats[index].nodes += nodes
+        stats[index].moves += 1
+        if move is None:
+            # No legal moves: the side to move loses
+            winner = 1 - game.to_move
+            break
+        game.play(move)
+        plies += 1
+        winner = game.winner()
+
+    winning_engine = None if winner in (None, DRAW) else engine_of_side[winner]
+    return GameRecord(opening, first_engine, winning_engine, plies, stats)
+
+
+def elo_difference(score: float) -> float | None:
+    """Elo difference that makes score the expected score, or None for a score of 0 or 1"""
+    # Rounding can leave a bound a hair inside [0, 1], which would be an absurdly large finite difference
+    if not score_epsilon < score < 1 - score_epsilon:
+        return None
+    return -400 * math.log10(1 / score - 1)
+
+
+def score_interval(score: float, num_of_games: int) -> tuple[float, float]:
+    """
+    Wilson confidence interval of the expected score. Unlike the normal approximation it stays inside [0, 1]
+    and does not shrink to a point when every game had the same result. Draws make it a little too wide.
+    """
+    z2 = z_score ** 2 / num_of_games
+    center = (score + z2 / 2) / (1 + z2)
+    margin = z_score * math.sqrt(score * (1 - score) / num_of_games + z2 / (4 * num_of_games)) / (1 + z2)
+    return max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+def summarize(game_name: str, configs: tuple[EngineConfig, EngineConfig], records: list[GameRecord]) -> MatchResult:
+    """Score, Elo with its confidence interval, and speed of both engines"""
+    scores = [1.0 if record.winning_engine == 0 else 0.0 if record.winning_engine == 1 else 0.5
+              for record in records]
+    score = statistics.fmean(scores)
+    low, high = score_interval(score, len(scores))
+
+    summaries = []
+    for index, config in enumerate(configs):
+        nodes = sum(record.stats[index].nodes for record in records)
+        seconds = sum(record.stats[index].seconds for record in records)
+        moves = sum(record.stats[index].moves for record in records)
+        summaries.append(EngineSummary(config.spec,
+                                       nodes_per_second=nodes / seconds if seconds else 0.0,
+                                       seconds_per_move=seconds / moves if moves else 0.0))
+
+    return MatchResult(game=game_name,
+                       engines=[config.spec for config in configs],
+                       games=len(records),
+                       wins=scores.count(1.0),
+                       losses=scores.count(0.0),
+                       draws=scores.count(0.5),
+                       score=score,
+                       elo=elo_difference(score),
+                       elo_low=elo_difference(low),
+                       elo_high=elo_difference(high),
+                       engine_summaries=summaries,
+                       records=records)
+
+
+def play_match(game_name: str, configs: tuple[EngineConfig, EngineConfig], num_of_games: int = default_games,
+               executor: ProcessPoolExecutor | None = None, nim_piles: list[int] | None = None,
+               opening_plies: int = default_opening_plies, max_plies: int = default_max_plies) -> MatchResult:
+    """
+    Play num_of_games games, every opening once with each engine moving first, in executor if given.
+    Games are independent, so a pool of processes plays as many games at a time as it has workers.
+    """
+    # Checked before any game starts, building the engines here would allocate their tables for nothing
+    for config in configs:
+        check_engine(config, game_name)
+    arguments = [(game_name, nim_piles, configs, game // 2, game % 2, opening_plies, max_plies)
+                 for game in range(num_of_games)]
+    if executor is None:
+        records = [play_game(*game_arguments) for game_arguments in arguments]
+    else:
+        records = list(executor.map(play_game, *zip(*arguments)))
+    return summarize(game_name, configs, records)
+
+
+def format_elo(elo: float | None, default: str) -> str:
+    # Rounding to an int first, so an Elo just below 0 is printed as +0 and not -0
+    return default if elo is None else f"{round(elo):+d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a match between two engine configurations")
+    parser.add_argument("engines", nargs=2, help="engine specifications, like alpha_beta:depth=3 or mcts:time=0.1")
+    parser.add_argument("--game", choices=("breakthrough", "nim", "tictactoe"), default="breakthrough")
+    parser.add_argument("--nim-piles", type=int, nargs="+", default=[20])
+    parser.add_argument("--games", type=int, default=default_games)
+    parser.add_argument("--workers", type=int, default=default_num_of_workers)
+    parser.add_argument("--opening-plies", type=int, default=default_opening_plies,
+                        help="random moves at the start of every game")
+    parser.add_argument("--max-plies", type=int, default=default_max_plies, help="plies before a game is a draw")
+    parser.add_argument("--output", default=default_output, help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    configs = (parse_engine(args.engines[0]), parse_engine(args.engines[1]))
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as executor:
+        result = play_match(args.game, configs, args.games, executor, args.nim_piles, args.opening_plies,
+                            args.max_plies)
+    seconds = time.perf_counter() - start_time
+
+    print(f"{configs[0].spec} vs {configs[1].spec} at {args.game}: +{result.wins} -{result.losses} ={result.draws}, "
+          f"score {result.score:.3f}, Elo {format_elo(result.elo, '+inf' if result.score > 0.5 else '-inf')} "
+          f"[{format_elo(result.elo_low, '-inf')}, {format_elo(result.elo_high, '+inf')}] "
+          f"in {seconds:.1f} s")
+    for summary in result.engine_summaries:
+        print(f"  {summary.spec}: {summary.nodes_per_second:,.0f} nodes/s, {summary.seconds_per_move:.3f} s per move")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "result": asdict(result),
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote the match to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,533 @@
+import functools
+import random
+import time
+from array import array
+from dataclasses import dataclass, field
+
+from search_common import (EXACT, LOWER_BOUND, UPPER_BOUND, SearchTimeout, from_table, to_table, win_score,
+                           win_threshold)
+
+# Breakthrough engine on bitboards. Every square of the size x size board is one bit of an int, square
+# row * size + column, and each side has one int with a bit set for every piece. White starts on rows 0
+# and 1 and moves towards higher rows, black starts on the last two rows and moves towards row 0, as in
+# challenge.py. A piece moves one row forward, straight onto an empty square or diagonally onto an empty
+# square or an enemy piece, which is captured. A side wins by reaching the far row or capturing all enemy
+# pieces, and loses if it cannot move.
+#
+# All moves of one kind are generated at once by shifting the bitboard one row forward and masking out
+# the squares they cannot go to. Moves are made and taken back in place, and the material and advancement
+# of both sides are updated with each move, so evaluation is O(1).
+#
+# The search keeps a transposition table keyed by a 64-bit Zobrist hash of the position, which play and
+# undo update with a few XORs. Pieces only ever move forward, so a position can never repeat within a game
+# and a stored value never depends on the moves that led to the position.
+
+WHITE, BLACK = 0, 1
+# Player names used by challenge.py
+player_symbols = ("W", "B")
+EMPTY_SYMBOL = "."
+
+default_size = 8
+piece_value = 10
+
+default_time_limit = 1.0
+max_search_depth = 64
+# Nodes searched between two looks at the clock
+nodes_per_time_check = 1024
+# The transposition table has 2^default_table_bits buckets of two entries
+default_table_bits = 18
+zobrist_seed = 2024
+
+NO_MOVE = 0
+
+type Move = int
+
+
+def make_move(from_square: int, to_square: int) -> Move:
+    """A move packed into an int: the from square in the high byte, the to square in the low byte"""
+    return from_square << 8 | to_square
+
+
+def move_squares(move: Move) -> tuple[int, int]:
+    return move >> 8, move & 0xFF
+
+
+def squares_of(bitboard: int):
+    """Yield the index of every set bit, lowest first"""
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+
+@functools.cache
+def zobrist_keys(size: int) -> tuple[tuple[list[int], list[int]], int]:
+    """
+    Random 64-bit keys for a white and a black piece on every square, and one for black to move. The hash
+    of a position is the XOR of the keys of its pieces (and the side key if black is to move), so a move
+    changes it by XORing in the keys of the squares it changes.
+    """
+    rng = random.Random(zobrist_seed + size)
+    piece_keys = ([rng.getrandbits(64) for _ in range(size * size)],
+                  [rng.getrandbits(64) for _ in range(size * size)])
+    return piece_keys, rng.getrandbits(64)
+
+
+class BreakthroughBoard:
+    """
+    A Breakthrough position with the side to move. play and undo change it in place; undo takes back the
+    last move played.
+    """
+
+    def __init__(self, size: int = default_size):
+        self.size = size
+        n = size
+        self.full = (1 << n * n) - 1
+        row = (1 << n) - 1
+        left_file = sum(1 << r * n for r in range(n))
+        self.not_left_file = self.full & ~left_file
+        self.not_right_file = self.full & ~(left_file << n - 1)
+        # The row each side has to reach
+        self.goal_rows = (row << n * (n - 1), row)
+        # How far a piece on a square has come from its own side's back row
+        self.advancement_of = (
+            [square // n for square in range(n * n)],
+            [n - 1 - square // n for square in range(n * n)],
+        )
+
+        self.pieces = [row | row << n, row << n * (n - 2) | row << n * (n - 1)]
+        self.counts = [2 * n, 2 * n]
+        self.advancement = [n, n]
+        self.to_move = WHITE
+        # (move, captured) for every move played, for undo
+        self.history: list[tuple[Move, bool]] = []
+        self.piece_keys, self.side_key = zobrist_keys(size)
+        self.hash = self.compute_hash()
+
+    @classmethod
+    def from_lists(cls, board: list[list[str]], player: str) -> "BreakthroughBoard":
+        """Convert a challenge.py board (rows of 'W', 'B' and '.') with player to move"""
+        position = cls(len(board))
+        position.pieces = [0, 0]
+        for r, row in enumerate(board):
+            for c, cell in enumerate(row):
+                if cell in player_symbols:
+                    position.pieces[player_symbols.index(cell)] |= 1 << r * position.size + c
+        position.to_move = player_symbols.index(player)
+        position.recount()
+        return position
+
+    def to_lists(self) -> list[list[str]]:
+        board = [[EMPTY_SYMBOL] * self.size for _ in range(self.size)]
+        for side in (WHITE, BLACK):
+            for square in squares_of(self.pieces[side]):
+                board[square // self.size][square % self.size] = player_symbols[side]
+        return board
+
+    def recount(self) -> None:
+        """Recompute the material and advancement counters from the bitboards"""
+        for side in (WHITE, BLACK):
+            self.counts[side] = self.pieces[side].bit_count()
+            self.advancement[side] = sum(self.advancement_of[side][square] for square in squares_of(self.pieces[side]))
+        self.hash = self.compute_hash()
+
+    def compute_hash(self) -> int:
+        """The Zobrist hash of the position from scratch; play and undo keep self.hash up to date"""
+        key = self.side_key if self.to_move == BLACK else 0
+        for side in (WHITE, BLACK):
+            for square in squares_of(self.pieces[side]):
+                key ^= self.piece_keys[side][square]
+        return key
+
+    def generate_moves(self) -> list[Move]:
+        """All legal moves of the side to move, captures first"""
+        moves = []
+        for targets, offset in self.move_targets():
+            # squares_of inlined, this is the hot loop of the search
+            while targets:
+                lowest = targets & -targets
+                to_square = lowest.bit_length() - 1
+                moves.append((to_square - offset) << 8 | to_square)
+                targets ^= lowest
+        return moves
+
+    def move_targets(self) -> tuple[tuple[int, int], ...]:
+        """
+        The moves of the side to move as (bitboard of target squares, offset of the target from the origin)
+        for captures to the left, captures to the right, the other diagonal moves and the straight moves
+        """
+        n = self.size
+        side = self.to_move
+        own, enemy = self.pieces[side], self.pieces[1 - side]
+        empty = self.full & ~(own | enemy)
+
+        if side == WHITE:
+            # Up a row: shift left by n, and by n - 1 or n + 1 for the diagonals
+            forward = (own << n) & empty
+            left = ((own & self.not_left_file) << n - 1) & self.full & ~own
+            right = ((own & self.not_right_file) << n + 1) & self.full & ~own
+            offsets = (n, n - 1, n + 1)
+        else:
+            forward = (own >> n) & empty
+            left = ((own & self.not_left_file) >> n + 1) & ~own
+            right = ((own & self.not_right_file) >> n - 1) & ~own
+            offsets = (-n, -n - 1, -n + 1)
+
+        forward_offset, left_offset, right_offset = offsets
+        return ((left & enemy, left_offset), (right & enemy, right_offset),
+                (left & empty, left_offset), (right & empty, right_offset),
+                (forward, forward_offset))
+
+    def play(self, move: Move) -> None:
+        from_square, to_square = move_squares(move)
+        side, other = self.to_move, 1 - self.to_move
+        to_bit = 1 << to_square
+        captured = bool(self.pieces[other] & to_bit)
+
+        self.pieces[side] ^= 1 << from_square | to_bit
+        self.advancement[side] += self.advancement_of[side][to_square] - self.advancement_of[side][from_square]
+        keys = self.piece_keys[side]
+        self.hash ^= keys[from_square] ^ keys[to_square] ^ self.side_key
+        if captured:
+            self.pieces[other] ^= to_bit
+            self.counts[other] -= 1
+            self.advancement[other] -= self.advancement_of[other][to_square]
+            self.hash ^= self.piece_keys[other][to_square]
+
+        self.history.append((move, captured))
+        self.to_move = other
+
+    def undo(self) -> None:
+        move, captured = self.history.pop()
+        from_square, to_square = move_squares(move)
+        other = self.to_move
+        side = 1 - other
+        to_bit = 1 << to_square
+
+        self.pieces[side] ^= 1 << from_square | to_bit
+        self.advancement[side] -= self.advancement_of[side][to_square] - self.advancement_of[side][from_square]
+        keys = self.piece_keys[side]
+        self.hash ^= keys[from_square] ^ keys[to_square] ^ self.side_key
+        if captured:
+            self.pieces[other] |= to_bit
+            self.counts[other] += 1
+            self.advancement[other] += self.advancement_of[other][to_square]
+            self.hash ^= self.piece_keys[other][to_square]
+
+        self.to_move = side
+
+    def winner(self) -> int | None:
+        """The side that has reached its goal row or captured every enemy piece, or None"""
+        for side in (WHITE, BLACK):
+            if self.pieces[side] & self.goal_rows[side] or self.counts[1 - side] == 0:
+                return side
+        return None
+
+    def is_lost(self) -> bool:
+        """True if the side that just moved has won, the only side which can have won since the last check"""
+        other = 1 - self.to_move
+        return bool(self.pieces[other] & self.goal_rows[other]) or self.counts[self.to_move] == 0
+
+    def evaluate_after(self, move: Move) -> int | None:
+        """
+        The evaluation for the side to move after playing move, computed from the changes the move makes
+        without playing it, or None if the move wins
+        """
+        from_square, to_square = move >> 8, move & 0xFF
+        side, other = self.to_move, 1 - self.to_move
+        if (1 << to_square) & self.goal_rows[side]:
+            return None
+
+        own_advancement = (self.advancement[side] + self.advancement_of[side][to_square]
+                           - self.advancement_of[side][from_square])
+        enemy_count, enemy_advancement = self.counts[other], self.advancement[other]
+        if self.pieces[other] >> to_square & 1:
+            if enemy_count == 1:
+                return None
+            enemy_count -= 1
+            enemy_advancement -= self.advancement_of[other][to_square]
+        return piece_value * (self.counts[side] - enemy_count) + own_advancement - enemy_advancement
+
+    def evaluate(self) -> int:
+        """Material and advancement of the side to move minus those of the other side"""
+        side, other = self.to_move, 1 - self.to_move
+        return (piece_value * (self.counts[side] - self.counts[other])
+                + self.advancement[side] - self.advancement[other])
+
+    def __str__(self) -> str:
+        return "\n".join(" ".join(row) for row in self.to_lists())
+
+
+class TranspositionTable:
+    """
+    A fixed-size transposition table in flat arrays, 2^bits buckets of two entries each. The first entry
+    of a bucket is depth-preferred: it is only replaced by a search at least as deep, and the entry it
+    held then moves to the second one. The second entry is always replaced, so recent shallow results
+    are kept too. Each entry holds the full 64-bit key, the value, its depth and kind, and the best move.
+    """
+
+    def __init__(self, bits: int = default_table_bits):
+        num_of_entries = 2 << bits
+        self.mask = (1 << bits) - 1
+        self.keys = array("Q", bytes(8 * num_of_entries))
+        self.values = array("i", bytes(4 * num_of_entries))
+        # -1 marks an empty entry
+        self.depths = array("b", [-1]) * num_of_entries
+        self.kinds = array("B", bytes(num_of_entries))
+        self.moves = array("H", bytes(2 * num_of_entries))
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+
+    def probe(self, key: int) -> int:
+        """Index of the entry for key, or -1 if it is not in the table"""
+        self.probes += 1
+        index = (key & self.mask) << 1
+        if self.keys[index] == key and self.depths[index] >= 0:
+            self.hits += 1
+            return index
+        index += 1
+        if self.keys[index] == key and self.depths[index] >= 0:
+            self.hits += 1
+            return index
+        return -1
+
+    def store(self, key: int, depth: int, value: int, kind: int, move: Move) -> None:
+        index = (key & self.mask) << 1
+        if self.keys[index] != key and depth < self.depths[index]:
+            # Shallower than the depth-preferred entry of another position
+            index += 1
+        elif self.keys[index] != key and self.depths[index] >= 0:
+            # Demote the entry being replaced to the always-replace entry
+            self.keys[index + 1] = self.keys[index]
+            self.values[index + 1] = self.values[index]
+            self.depths[index + 1] = self.depths[index]
+            self.kinds[index + 1] = self.kinds[index]
+            self.moves[index + 1] = self.moves[index]
+        self.keys[index] = key
+        self.values[index] = value
+        self.depths[index] = depth
+        self.kinds[index] = kind
+        self.moves[index] = move
+
+    def clear(self) -> None:
+        self.depths[:] = array("b", [-1]) * len(self.depths)
+        self.probes = self.hits = self.cutoffs = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+
+@dataclass
+class SearchResult:
+    move: Move | None
+    value: int
+    depth: int
+    nodes: int
+    seconds: float = 0.0
+    # Principal variation: the line of play the search expects, starting with move
+    pv: list[Move] = field(default_factory=list)
+
+
+class BreakthroughSearch:
+    """
+    Negamax alpha-beta search, to a fixed depth with search or within a time limit with iterative_deepening.
+    The transposition table is kept between searches; table_bits=None searches without one. With a
+    tablebase (a tablebase.Tablebase for the board size), positions it covers are looked up instead of searched.
+    """
+
+    def __init__(self, table_bits: int | None = default_table_bits, tablebase=None):
+        self.table = TranspositionTable(table_bits) if table_bits is not None else None
+        self.tablebase = tablebase
+        self.tablebase_hits = 0
+        self.nodes = 0
+        self.deadline: float | None = None
+        self.next_time_check = 0
+        # Principal variation of the previous iteration, searched first in the next one
+        self.previous_pv: list[Move] = []
+
+    def search(self, board: BreakthroughBoard, depth: int) -> SearchResult:
+        """Return the best move for the side to move, or None if the game is over"""
+        start_time = time.perf_counter()
+        self.nodes = 0
+        self.deadline = None
+        self.previous_pv = []
+        result = self.search_root(board, depth)
+        result.seconds = time.perf_counter() - start_time
+        return result
+
+    def iterative_deepening(self, board: BreakthroughBoard,
+                            time_limit: float = default_time_limit,
+                            max_depth: int = max_search_depth) -> SearchResult:
+        """
+        Search to depth 1, 2, 3, ... until time_limit seconds have passed and return the result of the
+        deepest search that completed, with the nodes and time of all iterations. Every iteration searches
+        the principal variation of the previous one first, which makes the cutoffs come early.
+        Depth 1 always completes, and the search stops early once it finds a forced win or loss.
+        """
+        start_time = time.perf_counter()
+        self.nodes = 0
+        self.next_time_check = nodes_per_time_check
+        self.previous_pv = []
+        history_length = len(board.history)
+        result = SearchResult(None, 0, 0, 0)
+
+        for depth in range(1, max_depth + 1):
+            self.deadline = start_time + time_limit if depth > 1 else None
+            try:
+                result = self.search_root(board, depth)
+            except SearchTimeout:
+                # Take back the moves of the abandoned search
+                while len(board.history) > history_length:
+                    board.undo()
+                break
+            self.previous_pv = result.pv
+            if abs(result.value) > win_threshold or time.perf_counter() >= start_time + time_limit:
+                break
+
+        self.deadline = None
+        result.nodes = self.nodes
+        result.seconds = time.perf_counter() - start_time
+        return result
+
+    def search_root(self, board: BreakthroughBoard, depth: int) -> SearchResult:
+        best_move, best_pv = None, []
+        alpha, beta = -win_score - 1, win_score + 1
+        if board.winner() is None:
+            moves = self.ordered_moves(board, 0)
+            pv_move = self.previous_pv[0] if self.previous_pv else None
+            for move in moves:
+                child_pv: list[Move] = []
+                board.play(move)
+                value = -self.negamax(board, depth - 1, 1, -beta, -alpha, child_pv, move == pv_move)
+                board.undo()
+                if best_move is None or value > alpha:
+                    best_move, alpha, best_pv = move, value, [move, *child_pv]
+        return SearchResult(best_move, alpha, depth, self.nodes, pv=best_pv)
+
+    def ordered_moves(self, board: BreakthroughBoard, ply: int, on_pv: bool = True,
+                      table_move: Move = NO_MOVE) -> list[Move]:
+        """
+        The moves of the position, with the move of the previous principal variation first if on it, and
+        the transposition table move before the other moves
+        """
+        moves = board.generate_moves()
+        if table_move != NO_MOVE and table_move in moves:
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+        if on_pv and ply < len(self.previous_pv):
+            pv_move = self.previous_pv[ply]
+            if pv_move in moves:
+                moves.remove(pv_move)
+                moves.insert(0, pv_move)
+        return moves
+
+    def negamax(self, board: BreakthroughBoard, depth: int, ply: int, alpha: int, beta: int,
+                pv: list[Move], on_pv: bool = False) -> int:
+        """
+        Value of the position for the side to move. pv is filled with the best line found, and on_pv tells
+        whether all moves so far follow the previous principal variation.
+        """
+        self.nodes += 1
+        if self.deadline is not None and self.nodes >= self.next_time_check:
+            self.next_time_check = self.nodes + nodes_per_time_check
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+
+        if board.is_lost():
+            return -(win_score - ply)
+        tablebase = self.tablebase
+        if tablebase is not None and board.counts[WHITE] + board.counts[BLACK] <= tablebase.max_pieces \
+                and tablebase.covers(board):
+            self.tablebase_hits += 1
+            return tablebase.score(board, ply)
+        if depth == 0:
+            return board.evaluate()
+
+        best_value = -win_score - 1
+        if depth == 1:
+            # The leaves below this node are scored with evaluate_after, without playing the moves or even
+            # listing them all, as the first capture often already causes a cutoff
+            for targets, offset in board.move_targets():
+                while targets:
+                    lowest = targets & -targets
+                    to_square = lowest.bit_length() - 1
+                    targets ^= lowest
+                    self.nodes += 1
+                    move = (to_square - offset) << 8 | to_square
+                    value = board.evaluate_after(move)
+                    if value is None:
+                        value = win_score - ply - 1
+                    if value > best_value:
+                        best_value = value
+                        if value > alpha:
+                            alpha = value
+                            pv[:] = [move]
+                            if alpha >= beta:
+                                return best_value
+            # No moves at all loses
+            return best_value if best_value > -win_score - 1 else -(win_score - ply)
+
+        table, key, table_move = self.table, board.hash, NO_MOVE
+        if table is not None:
+            index = table.probe(key)
+            if index >= 0:
+                table_move = table.moves[index]
+                if table.depths[index] >= depth:
+                    value, kind = from_table(table.values[index], ply), table.kinds[index]
+                    if kind == EXACT or (kind == LOWER_BOUND and value >= beta) or \
+                            (kind == UPPER_BOUND and value <= alpha):
+                        table.cutoffs += 1
+                        if table_move != NO_MOVE:
+                            pv[:] = [table_move]
+                        return value
+
+        moves = self.ordered_moves(board, ply, on_pv, table_move)
+        if not moves:
+            return -(win_score - ply)
+
+        original_alpha = alpha
+        best_move = NO_MOVE
+        pv_move = moves[0] if on_pv and ply < len(self.previous_pv) else None
+        for move in moves:
+            child_pv: list[Move] = []
+            board.play(move)
+            value = -self.negamax(board, depth - 1, ply + 1, -beta, -alpha, child_pv, move == pv_move)
+            board.undo()
+            if value > best_value:
+                best_value, best_move = value, move
+                if value > alpha:
+                    alpha = value
+                    pv[:] = [move, *child_pv]
+                    if alpha >= beta:
+                        break
+
+        if table is not None:
+            if best_value <= original_alpha:
+                kind = UPPER_BOUND
+            elif best_value >= beta:
+                kind = LOWER_BOUND
+            else:
+                kind = EXACT
+            # After a fail low every move was refuted and none is known to be best
+            table.store(key, depth, to_table(best_value, ply), kind, table_move if kind == UPPER_BOUND else best_move)
+        return best_value
+
+
+def format_move(move: Move, size: int = default_size) -> str:
+    """A move in the (row, column) coordinates of challenge.py"""
+    from_square, to_square = move_squares(move)
+    return f"{divmod(from_square, size)}->{divmod(to_square, size)}"
+
+
+def perft(board: BreakthroughBoard, depth: int) -> int:
+    """Number of move sequences of length depth, the standard check of a move generator"""
+    if depth == 0:
+        return 1
+    total = 0
+    for move in board.generate_moves():
+        board.play(move)
+        total += perft(board, depth - 1)
+        board.undo()
+    return total
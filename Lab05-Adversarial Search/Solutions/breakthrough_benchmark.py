@@ -0,0 +1,145 @@
+import random
+import time
+
+import challenge
+from breakthrough import BreakthroughBoard, BreakthroughSearch, default_table_bits, perft, player_symbols
+
+# Checks the bitboard engine in breakthrough.py against the list-based move generator in challenge.py,
+# and compares their speed.
+
+# Speed-up in search nodes/s over the list-based search that the bitboard engine was meant to reach
+target_speedup = 100
+
+
+def list_perft(board: list[list[str]], player: str, depth: int) -> int:
+    """perft with challenge.generate_moves"""
+    if depth == 0:
+        return 1
+    return sum(list_perft(successor, challenge.get_opponent(player), depth - 1)
+               for successor in challenge.generate_moves(board, player))
+
+
+def check_move_generation(num_of_positions: int = 200, seed: int = 0) -> None:
+    """
+    Play random games and check in every position that the engine and challenge.generate_moves produce the
+    same successor boards
+    """
+    rng = random.Random(seed)
+    checked = 0
+    while checked < num_of_positions:
+        position = BreakthroughBoard()
+        while position.winner() is None and checked < num_of_positions:
+            player = player_symbols[position.to_move]
+            expected = sorted(map(str, challenge.generate_moves(position.to_lists(), player)))
+            successors = []
+            moves = position.generate_moves()
+            for move in moves:
+                position.play(move)
+                successors.append(str(position.to_lists()))
+                position.undo()
+            assert sorted(successors) == expected, f"Move generation differs in\n{position}"
+            checked += 1
+            position.play(rng.choice(moves))
+
+
+def list_search_nodes(depth: int) -> tuple[int, float]:
+    """Nodes and seconds of challenge.list_alpha_beta_search from the initial board, counting is_terminal calls"""
+    nodes = 0
+    is_terminal = challenge.is_terminal
+
+    def counting_is_terminal(board, player):
+        nonlocal nodes
+        nodes += 1
+        return is_terminal(board, player)
+
+    challenge.is_terminal = counting_is_terminal
+    try:
+        start_time = time.perf_counter()
+        challenge.list_alpha_beta_search(challenge.initial_board(), depth, challenge.WHITE)
+        return nodes, time.perf_counter() - start_time
+    finally:
+        challenge.is_terminal = is_terminal
+
+
+def random_positions(num_of_positions: int, seed: int = 0) -> list[BreakthroughBoard]:
+    """Positions after 8 to 30 random moves, for searches away from the opening"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_of_positions:
+        position = BreakthroughBoard()
+        for _ in range(rng.randrange(8, 31)):
+            position.play(rng.choice(position.generate_moves()))
+            if position.winner() is not None:
+                break
+        if position.winner() is None:
+            positions.append(position)
+    return positions
+
+
+def compare_transposition_table(depths=(4, 5, 6), num_of_positions: int = 6, seed: int = 5) -> None:
+    """
+    Nodes and time of iterative deepening to each depth with and without the transposition table, over the
+    same random positions, and the hit rate of the table
+    """
+    positions = random_positions(num_of_positions, seed)
+    for depth in depths:
+        nodes = {}
+        seconds = {}
+        probes = hits = cutoffs = 0
+        for table_bits in (None, default_table_bits):
+            nodes[table_bits] = 0
+            start_time = time.perf_counter()
+            for position in positions:
+                search = BreakthroughSearch(table_bits)
+                nodes[table_bits] += search.iterative_deepening(position, float("inf"), depth).nodes
+                if search.table is not None:
+                    probes += search.table.probes
+                    hits += search.table.hits
+                    cutoffs += search.table.cutoffs
+            seconds[table_bits] = time.perf_counter() - start_time
+
+        without_table, with_table = nodes[None], nodes[default_table_bits]
+        print(f"Depth {depth}: {without_table} nodes in {seconds[None]:.2f} s without the table, "
+              f"{with_table} nodes in {seconds[default_table_bits]:.2f} s with it "
+              f"({1 - with_table / without_table:.0%} fewer nodes), "
+              f"hit rate {hits / probes:.0%}, cutoffs on {cutoffs / probes:.0%} of probes")
+
+
+def main():
+    check_move_generation()
+    print("Move generation matches challenge.generate_moves in 200 random positions")
+
+    for depth in range(1, 4):
+        start_time = time.perf_counter()
+        nodes = perft(BreakthroughBoard(), depth)
+        engine_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        list_nodes = list_perft(challenge.initial_board(), challenge.WHITE, depth)
+        list_time = time.perf_counter() - start_time
+
+        assert nodes == list_nodes
+        print(f"perft({depth}) = {nodes}: bitboards {nodes / engine_time:,.0f} nodes/s, "
+              f"lists {list_nodes / list_time:,.0f} nodes/s")
+
+    list_nodes, list_time = list_search_nodes(3)
+    list_speed = list_nodes / list_time
+    print(f"List-based search, depth 3: {list_nodes} nodes in {list_time:.3f} s, {list_speed:,.0f} nodes/s")
+
+    for depth in (3, 4, 5):
+        # A new search for every depth, so no depth starts with a table filled by the one before
+        search = BreakthroughSearch()
+        start_time = time.perf_counter()
+        result = search.search(BreakthroughBoard(), depth)
+        engine_time = time.perf_counter() - start_time
+        speedup = result.nodes / engine_time / list_speed
+        print(f"Bitboard search, depth {depth}: {result.nodes} nodes in {engine_time:.3f} s, "
+              f"{result.nodes / engine_time:,.0f} nodes/s, {speedup:.0f}x the list-based search"
+              + (f", short of the {target_speedup}x target" if speedup < target_speedup else ""))
+
+    print("\nIterative deepening over 6 random middlegame positions:")
+    compare_transposition_table()
+
+
+if __name__ == '__main__':
+    main()
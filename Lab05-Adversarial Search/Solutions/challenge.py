@@ -1,4 +1,9 @@
 import copy
+import functools
+
+from breakthrough import BreakthroughBoard, BreakthroughSearch
+from mcts import MCTS
+from tablebase import find_tablebase
 
 BOARD_SIZE = 8
 WHITE, BLACK, EMPTY = 'W', 'B', '.'
@@ -21,11 +26,11 @@ def get_opponent(player):
     return BLACK if player == WHITE else WHITE
 
 def is_terminal(board, player):
-    opponent = get_opponent(player)
-    # Win if any piece reaches home row
-    if player == WHITE and any(cell == WHITE for cell in board[BOARD_SIZE-1]):
+    # Win if any piece reaches home row. Both sides are checked, the side that just moved is the one
+    # which can have won, and that is usually not player.
+    if any(cell == WHITE for cell in board[BOARD_SIZE-1]):
         return True
-    if player == BLACK and any(cell == BLACK for cell in board[0]):
+    if any(cell == BLACK for cell in board[0]):
         return True
     # Lose if no pieces left
     white_exists = any(cell == WHITE for row in board for cell in row)
@@ -74,7 +79,48 @@ def generate_moves(board, player):
                             moves.append(new_board)
     return moves
 
-def alpha_beta_search(board, depth, player):
+def alpha_beta_search(board, depth, player, time_limit=None):
+    """
+    Return the board after the best move for player, searched to depth plies by the bitboard engine in
+    breakthrough.py. With a time_limit in seconds the search goes deeper one ply at a time, up to depth,
+    until the time is up.
+    """
+    board, _ = search_with_report(board, depth, player, time_limit)
+    return board
+
+def search_with_report(board, depth, player, time_limit=None):
+    """alpha_beta_search, also returning the SearchResult with the nodes, depth and time of the search"""
+    position = BreakthroughBoard.from_lists(board, player)
+    search = search_for_size(len(board))
+    if time_limit is None:
+        result = search.search(position, depth)
+    else:
+        result = search.iterative_deepening(position, time_limit, max_depth=depth)
+    if result.move is None:
+        return board, result
+    position.play(result.move)
+    return position.to_lists(), result
+
+@functools.cache
+def search_for_size(size):
+    """
+    The BreakthroughSearch used for every move on size x size boards, so its transposition table is
+    allocated once and what one move stored helps the next. Small boards with a tablebase built by
+    tablebase.py play their endgames perfectly.
+    """
+    return BreakthroughSearch(tablebase=find_tablebase(size))
+
+def mcts_search(board, player, time_limit=1.0, max_playouts=None):
+    """Return the board after the move Monte Carlo tree search plays most within the time or playout budget"""
+    position = BreakthroughBoard.from_lists(board, player)
+    result = MCTS().search(position, time_limit, max_playouts)
+    if result.move is None:
+        return board
+    position.play(result.move)
+    return position.to_lists()
+
+def list_alpha_beta_search(board, depth, player):
+    """The original search on lists of lists, kept to compare the engine against"""
     def max_value(state, alpha, beta, depth):
         if is_terminal(state, player) or depth == 0:
             return evaluate(state, player), state
@@ -108,12 +154,15 @@ def alpha_beta_search(board, depth, player):
 def play_breakthrough():
     board = initial_board()
     current_player = WHITE
-    depth = 3
+    # Each move is searched as deep as possible within time_limit seconds
+    max_depth = 64
+    time_limit = 1.0
 
     while not is_terminal(board, current_player):
         print_board(board)
         print(f"{current_player}'s turn...")
-        board = alpha_beta_search(board, depth, current_player)
+        board, result = search_with_report(board, max_depth, current_player, time_limit)
+        print(f"Depth {result.depth}, {result.nodes} nodes in {result.seconds:.2f} s")
         current_player = get_opponent(current_player)
 
     print_board(board)
@@ -0,0 +1,168 @@
+import bisect
+from collections.abc import Hashable
+from typing import Protocol
+
+from breakthrough import BreakthroughBoard
+from tictactoe import Board, Symbols, full_board, has_line, powers_of_three, win_masks
+
+# One interface for the Lab05 games, so the engines in negamax.py and mcts.py can play all of them.
+# A game is a position that is changed in place: play makes a move and undo takes back the last one.
+# Players are 0 and 1, and values are always from the point of view of the side to move.
+#
+# BreakthroughBoard already has this interface. NimGame and TicTacToeGame wrap the Nim variant of
+# alpha_beta.py and the tic-tac-toe of tictactoe.py.
+
+FIRST, SECOND = 0, 1
+# Returned by winner when the game ended without a winner
+DRAW = 2
+
+type Move = int
+
+
+class Game(Protocol):
+    # The side to move, 0 or 1
+    to_move: int
+    # Equal for positions with the same value for the side to move, used as transposition table key.
+    # The table does not check the position itself, so the key must be exact (the position index of
+    # tic-tac-toe, the piles of Nim) or wide enough that collisions do not happen (the 64-bit Zobrist hash
+    # of Breakthrough)
+    hash: Hashable
+    # One entry per move played, so the engines can take back the moves of an abandoned search
+    history: list
+
+    def generate_moves(self) -> list[Move]:
+        """The legal moves. A side without moves in a game that is not over has lost."""
+        ...
+
+    def play(self, move: Move) -> None:
+        ...
+
+    def undo(self) -> None:
+        ...
+
+    def winner(self) -> int | None:
+        """The side that has won, DRAW, or None if the game is not over"""
+        ...
+
+    def evaluate(self) -> int:
+        """Heuristic value for the side to move, far below a win"""
+        ...
+
+
+class NimGame:
+    """
+    The Nim variant of alpha_beta.py: split a pile into two unequal piles, and the side that cannot loses.
+    The piles are kept sorted, and a move splitting a pile is packed as pile << 16 | size of the smaller
+    new pile, so a move means the same in every order the position was reached in. Player 0 is MAX.
+    """
+
+    def __init__(self, piles: list[int], to_move: int = FIRST):
+        self.piles = sorted(piles)
+        self.to_move = to_move
+        self.history: list[Move] = []
+
+    @property
+    def hash(self) -> tuple[int, ...]:
+        """
+        The piles themselves, so positions only share a table entry when they are equal. Computed when
+        asked for, as rollouts never need it. The canonical form of alpha_beta.py would also merge positions
+        which are not the same distance from a win, and a table entry stores that distance.
+        """
+        return tuple(self.piles)
+
+    def generate_moves(self) -> list[Move]:
+        moves = []
+        # Equal piles have the same moves, and the piles are sorted
+        for pile in dict.fromkeys(self.piles):
+            if pile > 2:
+                moves.extend(pile << 16 | smaller for smaller in range(1, (pile + 1) // 2))
+        return moves
+
+    def play(self, move: Move) -> None:
+        pile, smaller = move >> 16, move & 0xFFFF
+        self.piles.pop(bisect.bisect_left(self.piles, pile))
+        bisect.insort(self.piles, pile - smaller)
+        bisect.insort(self.piles, smaller)
+        self.history.append(move)
+        self.to_move = 1 - self.to_move
+
+    def undo(self) -> None:
+        move = self.history.pop()
+        pile, smaller = move >> 16, move & 0xFFFF
+        self.piles.pop(bisect.bisect_left(self.piles, smaller))
+        self.piles.pop(bisect.bisect_left(self.piles, pile - smaller))
+        bisect.insort(self.piles, pile)
+        self.to_move = 1 - self.to_move
+
+    def winner(self) -> int | None:
+        """Every pile of 3 or more can be split, so the side to move has lost when all piles are 1 or 2"""
+        if all(pile <= 2 for pile in self.piles):
+            return 1 - self.to_move
+        return None
+
+    def evaluate(self) -> int:
+        # Nothing short of the end of the game tells who is winning
+        return 0
+
+
+class TicTacToeGame:
+    """Tic-tac-toe on the bitboards of tictactoe.py. A move is a square 0-8, player 0 is X."""
+
+    def __init__(self):
+        # The squares of X and of O
+        self.masks = [0, 0]
+        self.to_move = FIRST
+        self.history: list[Move] = []
+        # position_index of the board
+        self.hash = 0
+
+    @classmethod
+    def from_board(cls, state: Board) -> "TicTacToeGame":
+        game = cls()
+        for square, symbol in enumerate(state):
+            if symbol in Symbols.placed():
+                player = Symbols.placed().index(symbol)
+                game.masks[player] |= 1 << square
+                game.hash += (player + 1) * powers_of_three[square]
+        game.to_move = FIRST if game.masks[FIRST].bit_count() == game.masks[SECOND].bit_count() else SECOND
+        return game
+
+    def generate_moves(self) -> list[Move]:
+        occupied = self.masks[FIRST] | self.masks[SECOND]
+        return [square for square in range(9) if not occupied >> square & 1]
+
+    def play(self, move: Move) -> None:
+        self.masks[self.to_move] |= 1 << move
+        self.hash += (self.to_move + 1) * powers_of_three[move]
+        self.history.append(move)
+        self.to_move = 1 - self.to_move
+
+    def undo(self) -> None:
+        move = self.history.pop()
+        self.to_move = 1 - self.to_move
+        self.masks[self.to_move] ^= 1 << move
+        self.hash -= (self.to_move + 1) * powers_of_three[move]
+
+    def winner(self) -> int | None:
+        for player in (FIRST, SECOND):
+            if has_line(self.masks[player]):
+                return player
+        if self.masks[FIRST] | self.masks[SECOND] == full_board:
+            return DRAW
+        return None
+
+    def evaluate(self) -> int:
+        """Lines still open for the side to move minus lines still open for the other side"""
+        own, other = self.masks[self.to_move], self.masks[1 - self.to_move]
+        return sum((not (mask & other)) - (not (mask & own)) for mask in win_masks)
+
+
+def new_game(name: str, nim_piles: list[int] | None = None) -> Game:
+    """The starting position of the game called name: tictactoe, nim or breakthrough"""
+    if name == "tictactoe":
+        return TicTacToeGame()
+    if name == "nim":
+        return NimGame(nim_piles or [20])
+    if name == "breakthrough":
+        return BreakthroughBoard()
+    raise ValueError(f"Unknown game: {name}")
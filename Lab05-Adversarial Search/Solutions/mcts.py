@@ -0,0 +1,233 @@
+import argparse
+import math
+import os
+import random
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from breakthrough import format_move
+from games import DRAW, FIRST, SECOND, Game, Move, new_game
+
+# Monte Carlo tree search with UCT. Every iteration walks down the tree from the root, picking the child with
+# the best upper confidence bound, adds the children of the node it ends in, plays random games (rollouts)
+# from the first new child and counts the wins back up the path. The move played most often at the root is
+# the best move. Nothing about the game is used except its rules, so the same search plays every game in
+# games.py: only to_move, generate_moves, play, undo and winner of the Game interface are used.
+#
+# The tree is kept in flat arrays indexed by node number, and the children of a node are numbered
+# consecutively, so a node only needs the number of its first child and how many there are.
+# Several rollouts are played from every new node (batch_size), which spreads the cost of walking the tree.
+# root_parallel_search grows independent trees in a process pool and adds up their root visit counts.
+
+default_exploration = math.sqrt(2)
+default_batch_size = 4
+default_time_limit = 1.0
+default_num_of_workers = os.cpu_count() or 1
+
+
+@dataclass
+class MCTSResult:
+    move: Move | None
+    playouts: int
+    seconds: float
+    # Fraction of the rollouts through move won by the side to move, a draw counting as half a win
+    win_rate: float
+    # Root visits per move
+    move_visits: dict[Move, int] = field(default_factory=dict)
+    # Points scored per root move by the side to move, 2 per win and 1 per draw, so trees can be combined
+    move_wins: dict[Move, int] = field(default_factory=dict)
+
+    @property
+    def playouts_per_second(self) -> float:
+        return self.playouts / self.seconds if self.seconds else 0.0
+
+
+# Points of the first player for a rollout ending in a win of the first player, of the second player, or a draw
+points_of_first = {FIRST: 2, SECOND: 0, DRAW: 1}
+
+
+class MCTS:
+    def __init__(self, exploration: float = default_exploration, batch_size: int = default_batch_size,
+                 seed: int | None = None):
+        self.exploration = exploration
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+
+    def reset(self, to_move: int) -> None:
+        """An empty tree with only the root"""
+        # The move into the node, and the side that played it
+        self.moves = array("i", [0])
+        self.movers = array("b", [1 - to_move])
+        self.visits = array("i", [0])
+        # Points scored in the rollouts by the side that played the move into the node: 2 per win, 1 per draw
+        self.wins = array("i", [0])
+        self.first_child = array("i", [0])
+        # -1 until the node is expanded
+        self.num_of_children = array("i", [-1])
+
+    def search(self, board: Game, time_limit: float | None = default_time_limit,
+               max_playouts: int | None = None) -> MCTSResult:
+        """
+        Grow the tree from board until time_limit seconds have passed or max_playouts rollouts have been played,
+        whichever comes first, and return the most visited root move. board is left as it was.
+        """
+        if time_limit is None and max_playouts is None:
+            raise ValueError("MCTS needs a time limit or a playout budget")
+        start_time = time.perf_counter()
+        deadline = start_time + time_limit if time_limit is not None else math.inf
+        self.reset(board.to_move)
+        playouts = 0
+
+        while (max_playouts is None or playouts < max_playouts) and time.perf_counter() < deadline:
+            path = [0]
+            node = 0
+            # Selection
+            while self.num_of_children[node] > 0:
+                node = self.select_child(node)
+                board.play(self.moves[node])
+                path.append(node)
+
+            # Expansion
+            winner = board.winner()
+            if winner is None and self.num_of_children[node] < 0:
+                node = self.expand(node, board.generate_moves())
+                if node < 0:
+                    winner = 1 - board.to_move
+                else:
+                    board.play(self.moves[node])
+                    path.append(node)
+                    winner = board.winner()
+
+            # Simulation
+            if winner is None:
+                first_points = sum(points_of_first[self.rollout(board)] for _ in range(self.batch_size))
+            else:
+                first_points = points_of_first[winner] * self.batch_size
+            playouts += self.batch_size
+
+            # Backpropagation
+            for node in reversed(path):
+                self.visits[node] += self.batch_size
+                self.wins[node] += first_points if self.movers[node] == FIRST else 2 * self.batch_size - first_points
+            for _ in range(len(path) - 1):
+                board.undo()
+
+        return self.result(playouts, time.perf_counter() - start_time)
+
+    def select_child(self, node: int) -> int:
+        """The child with the highest upper confidence bound, or the first one not visited yet"""
+        first = self.first_child[node]
+        log_visits = math.log(self.visits[node])
+        best_child, best_score = first, -math.inf
+        for child in range(first, first + self.num_of_children[node]):
+            visits = self.visits[child]
+            if visits == 0:
+                return child
+            score = self.wins[child] / (2 * visits) + self.exploration * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best_child, best_score = child, score
+        return best_child
+
+    def expand(self, node: int, moves: list[Move]) -> int:
+        """Add the children of node in random order and return the first, or -1 if there are no moves"""
+        self.rng.shuffle(moves)
+        first = len(self.moves)
+        mover = 1 - self.movers[node]
+        self.first_child[node] = first
+        self.num_of_children[node] = len(moves)
+        if not moves:
+            return -1
+        self.moves.extend(moves)
+        self.movers.extend([mover] * len(moves))
+        self.visits.extend([0] * len(moves))
+        self.wins.extend([0] * len(moves))
+        self.first_child.extend([0] * len(moves))
+        self.num_of_children.extend([-1] * len(moves))
+        return first
+
+    def rollout(self, board: Game) -> int:
+        """Play uniformly random moves to the end of the game, take them back and return the winner or DRAW"""
+        choice = self.rng.choice
+        played = 0
+        winner = board.winner()
+        while winner is None:
+            moves = board.generate_moves()
+            if not moves:
+                winner = 1 - board.to_move
+                break
+            board.play(choice(moves))
+            played += 1
+            winner = board.winner()
+        for _ in range(played):
+            board.undo()
+        return winner
+
+    def result(self, playouts: int, seconds: float) -> MCTSResult:
+        first, count = self.first_child[0], max(self.num_of_children[0], 0)
+        move_visits = {self.moves[child]: self.visits[child] for child in range(first, first + count)}
+        move_wins = {self.moves[child]: self.wins[child] for child in range(first, first + count)}
+        if not move_visits:
+            return MCTSResult(None, playouts, seconds, 0.0)
+        best_child = max(range(first, first + count), key=self.visits.__getitem__)
+        win_rate = self.wins[best_child] / (2 * self.visits[best_child]) if self.visits[best_child] else 0.0
+        return MCTSResult(self.moves[best_child], playouts, seconds, win_rate, move_visits, move_wins)
+
+
+def grow_tree(board: Game, time_limit: float | None, max_playouts: int | None, seed: int,
+              exploration: float, batch_size: int) -> MCTSResult:
+    """One tree of root_parallel_search, in a worker process"""
+    return MCTS(exploration, batch_size, seed).search(board, time_limit, max_playouts)
+
+
+def root_parallel_search(board: Game, executor: ProcessPoolExecutor, num_of_trees: int = default_num_of_workers,
+                         time_limit: float | None = default_time_limit, max_playouts: int | None = None,
+                         seed: int = 0, exploration: float = default_exploration,
+                         batch_size: int = default_batch_size) -> MCTSResult:
+    """
+    Grow num_of_trees independent trees from board in executor, each with the full budget and its own seed,
+    and pick the move with the most root visits over all trees. Its win rate is over the rollouts through it
+    in all trees.
+    """
+    start_time = time.perf_counter()
+    results = list(executor.map(grow_tree, [board] * num_of_trees, [time_limit] * num_of_trees,
+                                [max_playouts] * num_of_trees, range(seed, seed + num_of_trees),
+                                [exploration] * num_of_trees, [batch_size] * num_of_trees))
+    move_visits, move_wins = Counter(), Counter()
+    for result in results:
+        move_visits.update(result.move_visits)
+        move_wins.update(result.move_wins)
+    playouts = sum(result.playouts for result in results)
+    seconds = time.perf_counter() - start_time
+    if not move_visits:
+        return MCTSResult(None, playouts, seconds, 0.0)
+    move = max(move_visits, key=move_visits.__getitem__)
+    win_rate = move_wins[move] / (2 * move_visits[move]) if move_visits[move] else 0.0
+    return MCTSResult(move, playouts, seconds, win_rate, dict(move_visits), dict(move_wins))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Playouts per second of MCTS on the games in games.py")
+    parser.add_argument("--time-limit", type=float, default=default_time_limit, help="seconds per search")
+    parser.add_argument("--workers", type=int, default=default_num_of_workers,
+                        help="trees grown in parallel by root_parallel_search")
+    parser.add_argument("--nim-piles", type=int, nargs="+", default=[60])
+    args = parser.parse_args()
+
+    games = (("Tic-tac-toe", new_game("tictactoe"), lambda move: f"square {move}"),
+             (f"Nim {args.nim_piles}", new_game("nim", args.nim_piles), lambda move: f"split {move & 0xFFFF} off"),
+             ("Breakthrough", new_game("breakthrough"), format_move))
+    with ProcessPoolExecutor(args.workers) as executor:
+        for name, board, describe in games:
+            result = MCTS(seed=0).search(board, args.time_limit)
+            print(f"{name}: {describe(result.move)}, win rate {result.win_rate:.2f}, "
+                  f"{result.playouts} playouts, {result.playouts_per_second:,.0f} playouts/s")
+            result = root_parallel_search(board, executor, args.workers, args.time_limit)
+            print(f"{name}, {args.workers} trees in parallel: {describe(result.move)}, win rate {result.win_rate:.2f}, "
+                  f"{result.playouts} playouts, {result.playouts_per_second:,.0f} playouts/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+import random
+import time
+
+from search_common import (EXACT, LOWER_BOUND, UPPER_BOUND, TableEntry, describe, from_table, store_killer, to_table,
+                           win_score)
+
+# The m,n,k-game: two players take turns placing stones on an m x n board, and the first to get k in a
+# row (horizontally, vertically or diagonally) wins. Tic-tac-toe is the 3,3,3-game, gomoku the 15,15,5-game.
+#
+# The search is a negamax alpha-beta search with
+# - win detection at the last move only, counting stones along the 4 lines through it,
+# - move ordering: transposition table move, then two killer moves per ply, then the history heuristic,
+# - a transposition table keyed by Zobrist hashes folded over the board symmetries: one hash is kept per
+#   symmetry, and the smallest is the key, so all rotations and reflections of a position share an entry.
+
+FIRST, SECOND, EMPTY = 1, -1, 0
+
+# Evaluation weight of a window of k squares with only one player's stones, by number of stones
+window_weights = (0, 1, 8, 64, 512, 4096)
+
+type Square = int
+
+
+class MNKBoard:
+    """
+    An m x n board (m rows, n columns) for k in a row. Square r * n + c is row r, column c.
+    Moves are made and taken back in place with play and undo.
+    """
+
+    def __init__(self, m: int, n: int, k: int, seed: int = 0):
+        self.m, self.n, self.k = m, n, k
+        self.cells = [EMPTY] * (m * n)
+        self.moves: list[Square] = []
+        self.symmetries = board_symmetries(m, n)
+
+        # One random 64-bit number per player and square; the hash under symmetry s of a position XORs the
+        # numbers of the squares its stones move to under s
+        rng = random.Random(seed)
+        zobrist = {player: [rng.getrandbits(64) for _ in range(m * n)] for player in (FIRST, SECOND)}
+        self.zobrist = [{player: [zobrist[player][permutation[square]] for square in range(m * n)]
+                         for player in (FIRST, SECOND)}
+                        for permutation in self.symmetries]
+        self.hashes = [0] * len(self.symmetries)
+
+        # Every line of k squares on the board, for the evaluation
+        self.windows = board_windows(m, n, k)
+
+    @property
+    def to_move(self) -> int:
+        return FIRST if len(self.moves) % 2 == 0 else SECOND
+
+    def legal_moves(self) -> list[Square]:
+        return [square for square, cell in enumerate(self.cells) if cell == EMPTY]
+
+    def is_full(self) -> bool:
+        return len(self.moves) == len(self.cells)
+
+    def play(self, square: Square) -> None:
+        player = self.to_move
+        self.cells[square] = player
+        self.moves.append(square)
+        for s, zobrist in enumerate(self.zobrist):
+            self.hashes[s] ^= zobrist[player][square]
+
+    def undo(self) -> None:
+        square = self.moves.pop()
+        player = self.cells[square]
+        self.cells[square] = EMPTY
+        for s, zobrist in enumerate(self.zobrist):
+            self.hashes[s] ^= zobrist[player][square]
+
+    def is_win_at(self, square: Square) -> bool:
+        """True if the stone on square is part of k in a row. Only the 4 lines through square are checked."""
+        player = self.cells[square]
+        row, column = divmod(square, self.n)
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            count = 1
+            for sign in (1, -1):
+                r, c = row + sign * dr, column + sign * dc
+                while 0 <= r < self.m and 0 <= c < self.n and self.cells[r * self.n + c] == player:
+                    count += 1
+                    r, c = r + sign * dr, c + sign * dc
+            if count >= self.k:
+                return True
+        return False
+
+    def canonical_hash(self) -> tuple[int, int]:
+        """The smallest hash over the symmetries, and the index of the symmetry it belongs to"""
+        best = min(range(len(self.hashes)), key=self.hashes.__getitem__)
+        return self.hashes[best], best
+
+    def evaluate(self) -> int:
+        """
+        Score of the position for the player to move: every window of k squares holding stones of only one
+        player counts for that player, more the fuller it is
+        """
+        score = 0
+        for window in self.windows:
+            first = second = 0
+            for square in window:
+                cell = self.cells[square]
+                if cell == FIRST:
+                    first += 1
+                elif cell == SECOND:
+                    second += 1
+            if second == 0:
+                score += window_weights[min(first, len(window_weights) - 1)]
+            elif first == 0:
+                score -= window_weights[min(second, len(window_weights) - 1)]
+        return score * self.to_move
+
+    def __str__(self) -> str:
+        symbols = {FIRST: "X", SECOND: "O", EMPTY: "."}
+        return "\n".join(" ".join(symbols[self.cells[r * self.n + c]] for c in range(self.n))
+                         for r in range(self.m))
+
+
+def board_symmetries(m: int, n: int) -> list[list[Square]]:
+    """
+    The symmetries of an m x n board as permutations of the squares: the 8 rotations and reflections of
+    a square board, or the 4 that keep a rectangular board in place. Identity first.
+    """
+    def square_at(r: int, c: int) -> Square:
+        return r * n + c
+
+    transforms = [
+        lambda r, c: (r, c),
+        lambda r, c: (r, n - 1 - c),
+        lambda r, c: (m - 1 - r, c),
+        lambda r, c: (m - 1 - r, n - 1 - c),
+    ]
+    if m == n:
+        transforms += [
+            lambda r, c: (c, r),
+            lambda r, c: (c, n - 1 - r),
+            lambda r, c: (n - 1 - c, r),
+            lambda r, c: (n - 1 - c, n - 1 - r),
+        ]
+    return [[square_at(*transform(*divmod(square, n))) for square in range(m * n)] for transform in transforms]
+
+
+def board_windows(m: int, n: int, k: int) -> list[tuple[Square, ...]]:
+    """Every line of k consecutive squares in the 4 directions"""
+    windows = []
+    for row in range(m):
+        for column in range(n):
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_row, end_column = row + (k - 1) * dr, column + (k - 1) * dc
+                if 0 <= end_row < m and 0 <= end_column < n:
+                    windows.append(tuple((row + i * dr) * n + column + i * dc for i in range(k)))
+    return windows
+
+
+class MNKSearch:
+    """
+    Alpha-beta search with a transposition table shared by all symmetric positions, killer moves and
+    the history heuristic. The table and the history are kept between searches.
+    """
+
+    def __init__(self):
+        # The move of an entry is in the orientation of the canonical symmetry
+        self.transposition_table: dict[int, TableEntry] = {}
+        self.history: dict[Square, int] = {}
+        self.killers: list[list[Square]] = []
+        self.nodes = 0
+
+    def best_move(self, board: MNKBoard, depth: int | None = None) -> tuple[Square, int]:
+        """
+        Return the best move for the player to move and its score. Without a depth the game is searched to
+        the end, which gives the exact result; +-win_score means a forced win or loss, 0 a draw.
+        Raises ValueError if the game is already over or depth is less than 1.
+        """
+        if (board.moves and board.is_win_at(board.moves[-1])) or board.is_full():
+            raise ValueError(f"No move on a finished board:\n{board}")
+        if depth is None:
+            depth = len(board.cells) - len(board.moves)
+        if depth < 1:
+            raise ValueError(f"Search depth must be at least 1, not {depth}")
+        self.killers = [[] for _ in range(depth + 1)]
+        self.nodes = 0
+        value = self.negamax(board, depth, 0, -win_score - 1, win_score + 1)
+        key, symmetry = board.canonical_hash()
+        return board.symmetries[symmetry].index(self.transposition_table[key].move), value
+
+    def negamax(self, board: MNKBoard, depth: int, ply: int, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if depth == 0:
+            return board.evaluate()
+
+        key, symmetry = board.canonical_hash()
+        permutation = board.symmetries[symmetry]
+        entry = self.transposition_table.get(key)
+        table_move = None
+        if entry is not None:
+            if entry.move is not None:
+                table_move = permutation.index(entry.move)
+            if entry.depth >= depth:
+                value = from_table(entry.value, ply)
+                if entry.kind == EXACT:
+                    return value
+                if entry.kind == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        original_alpha = alpha
+        best_value, best_move = -win_score - 1, None
+        for move in self.ordered_moves(board, ply, table_move):
+            board.play(move)
+            if board.is_win_at(move):
+                value = win_score - ply - 1
+            elif board.is_full():
+                value = 0
+            else:
+                value = -self.negamax(board, depth - 1, ply + 1, -beta, -alpha)
+            board.undo()
+
+            if value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                store_killer(self.killers, ply, move)
+                self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+
+        if best_value <= original_alpha:
+            kind = UPPER_BOUND
+        elif best_value >= beta:
+            kind = LOWER_BOUND
+        else:
+            kind = EXACT
+        stored_move = permutation[best_move] if best_move is not None else None
+        self.transposition_table[key] = TableEntry(depth, to_table(best_value, ply), kind, stored_move)
+        return best_value
+
+    def ordered_moves(self, board: MNKBoard, ply: int, table_move: Square | None) -> list[Square]:
+        """Transposition table move first, then the killer moves of this ply, then by history score"""
+        killers = self.killers[ply] if ply < len(self.killers) else []
+        center_row, center_column = (board.m - 1) / 2, (board.n - 1) / 2
+
+        def priority(square: Square) -> tuple:
+            row, column = divmod(square, board.n)
+            # Central squares lie on more lines, so they go first among moves without a history
+            distance = abs(row - center_row) + abs(column - center_column)
+            return (square != table_move, square not in killers, -self.history.get(square, 0), distance)
+
+        return sorted(board.legal_moves(), key=priority)
+
+
+def main():
+    # Solve tic-tac-toe and 4 x 4 with 3 in a row completely, then play 5 x 5 with 4 in a row to a fixed depth
+    for m, n, k, depth in ((3, 3, 3, None), (4, 4, 3, None), (5, 5, 4, 4)):
+        board = MNKBoard(m, n, k)
+        search = MNKSearch()
+        start_time = time.perf_counter()
+        move, value = search.best_move(board, depth)
+        elapsed_time = time.perf_counter() - start_time
+        print(f"{m},{n},{k}-game, depth {depth or 'full'}: move {divmod(move, n)}, {describe(value)}, "
+              f"{search.nodes} nodes, {len(search.transposition_table)} table entries, {elapsed_time:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import time
+from collections.abc import Hashable
+
+from breakthrough import SearchResult, default_time_limit, max_search_depth, nodes_per_time_check
+from games import DRAW, Game, Move, new_game
+from search_common import (EXACT, LOWER_BOUND, UPPER_BOUND, SearchTimeout, TableEntry, describe, from_table,
+                           store_killer, to_table, win_score, win_threshold)
+
+# A negamax principal variation search for any game in games.py, with
+# - a transposition table keyed by the hash of the game,
+# - move ordering: transposition table move, then two killer moves per ply, then the history heuristic,
+# - iterative deepening within a time limit, which fills the table with the best moves of the shallower
+#   searches before the deeper ones need them.
+# The first move of every node is searched with the full window and the others with a null window around
+# alpha, which only proves them worse; a move that turns out better is searched again with the full window.
+
+# The transposition table is emptied when it grows beyond this many entries
+max_table_entries = 1 << 20
+
+
+class NegamaxSearch:
+    """
+    Principal variation search, to a fixed depth with search or within a time limit with iterative_deepening.
+    The transposition table and the history are kept between searches of the same game.
+    """
+
+    def __init__(self):
+        self.transposition_table: dict[Hashable, TableEntry] = {}
+        self.history: dict[Move, int] = {}
+        self.killers: list[list[Move]] = []
+        self.nodes = 0
+        self.deadline: float | None = None
+        self.next_time_check = 0
+
+    def search(self, game: Game, depth: int) -> SearchResult:
+        """Return the best move for the side to move, or None if the game is over"""
+        start_time = time.perf_counter()
+        self.nodes = 0
+        self.deadline = None
+        result = self.search_root(game, depth)
+        result.seconds = time.perf_counter() - start_time
+        return result
+
+    def iterative_deepening(self, game: Game, time_limit: float = default_time_limit,
+                            max_depth: int = max_search_depth) -> SearchResult:
+        """
+        Search to depth 1, 2, 3, ... until time_limit seconds have passed and return the result of the deepest
+        search that completed. Depth 1 always completes, and the search stops early once the value is decided.
+        """
+        start_time = time.perf_counter()
+        self.nodes = 0
+        self.next_time_check = nodes_per_time_check
+        history_length = len(game.history)
+        result = SearchResult(None, 0, 0, 0)
+
+        for depth in range(1, max_depth + 1):
+            self.deadline = start_time + time_limit if depth > 1 else None
+            try:
+                result = self.search_root(game, depth)
+            except SearchTimeout:
+                # Take back the moves of the abandoned search
+                while len(game.history) > history_length:
+                    game.undo()
+                break
+            if abs(result.value) > win_threshold or time.perf_counter() >= start_time + time_limit:
+                break
+
+        self.deadline = None
+        result.nodes = self.nodes
+        result.seconds = time.perf_counter() - start_time
+        return result
+
+    def search_root(self, game: Game, depth: int) -> SearchResult:
+        self.killers = [[] for _ in range(depth + 1)]
+        if len(self.transposition_table) > max_table_entries:
+            self.transposition_table.clear()
+        pv: list[Move] = []
+        value = self.negamax(game, depth, 0, -win_score - 1, win_score + 1, pv)
+        return SearchResult(pv[0] if pv else None, value, depth, self.nodes, pv=pv)
+
+    def negamax(self, game: Game, depth: int, ply: int, alpha: int, beta: int, pv: list[Move]) -> int:
+        """Value of the position for the side to move; pv is filled with the best line found"""
+        self.nodes += 1
+        if self.deadline is not None and self.nodes >= self.next_time_check:
+            self.next_time_check = self.nodes + nodes_per_time_check
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+
+        winner = game.winner()
+        if winner is not None:
+            if winner == DRAW:
+                return 0
+            return win_score - ply if winner == game.to_move else -(win_score - ply)
+        if depth == 0:
+            return game.evaluate()
+
+        key = game.hash
+        entry = self.transposition_table.get(key)
+        table_move = None
+        if entry is not None:
+            table_move = entry.move
+            # The root always searches, so it has a move to return
+            if entry.depth >= depth and ply > 0:
+                value = from_table(entry.value, ply)
+                if entry.kind == EXACT or (entry.kind == LOWER_BOUND and value >= beta) or \
+                        (entry.kind == UPPER_BOUND and value <= alpha):
+                    if table_move is not None:
+                        pv[:] = [table_move]
+                    return value
+
+        moves = self.ordered_moves(game, ply, table_move)
+        if not moves:
+            return -(win_score - ply)
+
+        original_alpha = alpha
+        best_value, best_move = -win_score - 1, None
+        for i, move in enumerate(moves):
+            child_pv: list[Move] = []
+            game.play(move)
+            if i == 0:
+                value = -self.negamax(game, depth - 1, ply + 1, -beta, -alpha, child_pv)
+            else:
+                value = -self.negamax(game, depth - 1, ply + 1, -alpha - 1, -alpha, child_pv)
+                if alpha < value < beta:
+                    child_pv = []
+                    value = -self.negamax(game, depth - 1, ply + 1, -beta, -alpha, child_pv)
+            game.undo()
+
+            if value > best_value:
+                best_value, best_move = value, move
+                if value > alpha:
+                    alpha = value
+                    pv[:] = [move, *child_pv]
+                    if alpha >= beta:
+                        store_killer(self.killers, ply, move)
+                        self.history[move] = self.history.get(move, 0) + depth * depth
+                        break
+
+        if best_value <= original_alpha:
+            kind = UPPER_BOUND
+            # Every move was refuted and none is known to be best
+            best_move = table_move
+        elif best_value >= beta:
+            kind = LOWER_BOUND
+        else:
+            kind = EXACT
+        self.transposition_table[key] = TableEntry(depth, to_table(best_value, ply), kind, best_move)
+        return best_value
+
+    def ordered_moves(self, game: Game, ply: int, table_move: Move | None) -> list[Move]:
+        """Transposition table move first, then the killer moves of this ply, then by history score"""
+        killers = self.killers[ply] if ply < len(self.killers) else []
+
+        def priority(move: Move) -> tuple:
+            return move != table_move, move not in killers, -self.history.get(move, 0)
+
+        return sorted(game.generate_moves(), key=priority)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the starting position of each game with one engine")
+    parser.add_argument("--time-limit", type=float, default=default_time_limit, help="seconds per search")
+    parser.add_argument("--nim-piles", type=int, nargs="+", default=[20])
+    args = parser.parse_args()
+
+    for name in ("tictactoe", "nim", "breakthrough"):
+        game = new_game(name, args.nim_piles)
+        search = NegamaxSearch()
+        result = search.iterative_deepening(game, args.time_limit)
+        print(f"{name}: move {result.move}, depth {result.depth}, {describe(result.value)}, {result.nodes} nodes "
+              f"in {result.seconds:.2f} s, {result.nodes / result.seconds:,.0f} nodes/s")
+
+
+if __name__ == '__main__':
+    main()
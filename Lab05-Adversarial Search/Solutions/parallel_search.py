@@ -0,0 +1,199 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import alpha_beta
+from breakthrough import (BreakthroughBoard, BreakthroughSearch, Move, SearchResult, format_move, player_symbols,
+                          win_score)
+from breakthrough_benchmark import random_positions
+
+# Parallel alpha-beta by splitting the root: the moves of the root position are searched by a pool of worker
+# processes. Like young brothers wait, the first (eldest) move is searched alone first, so there is a good
+# alpha before the other moves start. The best value found so far is kept in shared memory; a worker reads it
+# before searching a move and only has to prove the move worse than that, and raises it when the move is
+# better. A move that fails low only gives an upper bound, so the best move is picked among the moves whose
+# value is exact.
+#
+# Each worker keeps its own search object, and with it its own transposition table, between moves.
+#
+# Example:
+#   python parallel_search.py --workers 1 2 4 8 --depth 5 --nim-piles 60
+
+default_num_of_workers = os.cpu_count() or 1
+default_benchmark_workers = (1, 2, 4, 8)
+default_depth = 5
+default_num_of_positions = 4
+default_nim_piles = (60,)
+
+# Set in every worker process by init_worker
+shared_alpha = None
+worker_search: BreakthroughSearch | None = None
+
+
+@dataclass
+class RootMoveResult:
+    move: Move
+    value: int
+    # True if value is the exact value of the move, False if it is only an upper bound
+    exact: bool
+    nodes: int
+
+
+def init_worker(alpha) -> None:
+    global shared_alpha, worker_search
+    shared_alpha = alpha
+    worker_search = BreakthroughSearch()
+    # A forked worker starts with a copy of the parent's table; start empty so every worker count does the same work
+    alpha_beta.transposition_table.clear()
+
+
+def raise_shared_alpha(value: int) -> None:
+    with shared_alpha.get_lock():
+        if value > shared_alpha.value:
+            shared_alpha.value = value
+
+
+def search_breakthrough_move(board: list[list[str]], player: str, move: Move, depth: int) -> RootMoveResult:
+    """Search one root move in a worker with the window (shared alpha, win)"""
+    position = BreakthroughBoard.from_lists(board, player)
+    alpha = shared_alpha.value
+    worker_search.nodes = 0
+    position.play(move)
+    value = -worker_search.negamax(position, depth - 1, 1, -win_score - 1, -alpha, [])
+    if value > alpha:
+        raise_shared_alpha(value)
+    return RootMoveResult(move, value, value > alpha, worker_search.nodes)
+
+
+def search_nim_successor(index: int, successor: alpha_beta.Piles) -> RootMoveResult:
+    """Solve the position after one root move in a worker with the window (shared alpha, +1)"""
+    alpha = shared_alpha.value
+    if alpha >= alpha_beta.highest_utility:
+        # A winning move has been found already
+        return RootMoveResult(index, alpha, False, 0)
+    value = alpha_beta.position_value(alpha_beta.canonical(successor), False, alpha, alpha_beta.highest_utility)
+    if value > alpha:
+        raise_shared_alpha(value)
+    return RootMoveResult(index, value, value > alpha, 0)
+
+
+class ParallelSearch:
+    """A pool of worker processes sharing the best root value, for Breakthrough and Nim"""
+
+    def __init__(self, num_of_workers: int = default_num_of_workers):
+        self.num_of_workers = num_of_workers
+        self.shared_alpha = multiprocessing.Value("i", 0)
+        self.executor = ProcessPoolExecutor(num_of_workers, initializer=init_worker, initargs=(self.shared_alpha,))
+        # The eldest move is searched in this process
+        self.search = BreakthroughSearch()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.executor.shutdown()
+
+    def breakthrough_search(self, board: BreakthroughBoard, depth: int) -> SearchResult:
+        """The best move for the side to move in board, searched to depth plies"""
+        start_time = time.perf_counter()
+        moves = self.search.ordered_moves(board, 0)
+        if board.winner() is not None or not moves:
+            return SearchResult(None, 0, depth, 0)
+
+        self.search.nodes = 0
+        eldest, *younger = moves
+        board.play(eldest)
+        best = RootMoveResult(eldest, -self.search.negamax(board, depth - 1, 1, -win_score - 1, win_score + 1, []),
+                              True, self.search.nodes)
+        board.undo()
+        self.shared_alpha.value = best.value
+        nodes = best.nodes
+
+        lists, player = board.to_lists(), player_symbols[board.to_move]
+        futures = [self.executor.submit(search_breakthrough_move, lists, player, move, depth) for move in younger]
+        for future in as_completed(futures):
+            result = future.result()
+            nodes += result.nodes
+            if result.exact and result.value > best.value:
+                best = result
+
+        return SearchResult(best.move, best.value, depth, nodes, time.perf_counter() - start_time)
+
+    def nim_decision(self, state: alpha_beta.Piles) -> alpha_beta.Piles:
+        """The state after the best move for MAX, like alpha_beta.alpha_beta_decision"""
+        successors = alpha_beta.successors_of(state)
+        best_index = 0
+        best_value = alpha_beta.position_value(alpha_beta.canonical(successors[0]), False)
+        self.shared_alpha.value = best_value
+
+        futures = [self.executor.submit(search_nim_successor, index, successor)
+                   for index, successor in enumerate(successors[1:], 1)]
+        for future in as_completed(futures):
+            result = future.result()
+            if result.exact and result.value > best_value:
+                best_index, best_value = result.move, result.value
+        return successors[best_index]
+
+
+def benchmark_breakthrough(worker_counts, depth: int, num_of_positions: int) -> None:
+    positions = random_positions(num_of_positions)
+    serial_time = 0.0
+    serial_results = []
+    for position in positions:
+        result = BreakthroughSearch().search(position, depth)
+        serial_time += result.seconds
+        serial_results.append(result)
+    print(f"Breakthrough, {num_of_positions} positions at depth {depth}: serial {serial_time:.2f} s")
+
+    for num_of_workers in worker_counts:
+        with ParallelSearch(num_of_workers) as parallel:
+            parallel_time = 0.0
+            nodes = 0
+            for position, serial_result in zip(positions, serial_results):
+                result = parallel.breakthrough_search(position, depth)
+                assert result.value == serial_result.value, (
+                    f"{format_move(result.move)} {result.value} != {serial_result.value}")
+                parallel_time += result.seconds
+                nodes += result.nodes
+        print(f"  {num_of_workers} workers: {parallel_time:.2f} s, speedup {serial_time / parallel_time:.2f}, "
+              f"{nodes} nodes ({nodes / sum(result.nodes for result in serial_results):.2f}x serial)")
+
+
+def benchmark_nim(worker_counts, piles) -> None:
+    state = list(piles)
+    alpha_beta.transposition_table.clear()
+    start_time = time.perf_counter()
+    expected = alpha_beta.alpha_beta_decision(state)
+    serial_time = time.perf_counter() - start_time
+    print(f"Nim {state}: serial {serial_time:.2f} s")
+
+    expected_value = alpha_beta.position_value(alpha_beta.canonical(expected), False)
+    for num_of_workers in worker_counts:
+        alpha_beta.transposition_table.clear()
+        with ParallelSearch(num_of_workers) as parallel:
+            start_time = time.perf_counter()
+            decision = parallel.nim_decision(state)
+            parallel_time = time.perf_counter() - start_time
+        assert alpha_beta.position_value(alpha_beta.canonical(decision), False) == expected_value
+        print(f"  {num_of_workers} workers: {parallel_time:.2f} s, speedup {serial_time / parallel_time:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speedup of root-splitting parallel search")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_benchmark_workers)
+    parser.add_argument("--depth", type=int, default=default_depth, help="Breakthrough search depth")
+    parser.add_argument("--positions", type=int, default=default_num_of_positions,
+                        help="number of random Breakthrough positions")
+    parser.add_argument("--nim-piles", type=int, nargs="+", default=default_nim_piles)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU cores available")
+    benchmark_breakthrough(args.workers, args.depth, args.positions)
+    benchmark_nim(args.workers, args.nim_piles)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+
+# The pieces shared by the alpha-beta searches of alpha_beta.py, breakthrough.py, mnk_game.py and negamax.py:
+# scores of won and lost games, the kinds of transposition table entries, the timeout of a timed search
+# and the killer moves. It imports no game, so every engine can import it.
+
+# A win is worth more than any evaluation. Wins are scored win_score - ply, so a faster win is better.
+win_score = 1_000_000
+# Scores beyond this are wins or losses, whose ply is adjusted when stored in the transposition table
+win_threshold = win_score // 2
+
+# Kinds of values stored in the transposition table. A search that was cut off by the alpha-beta
+# window only knows a bound on the value of the position.
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+num_of_killers = 2
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline has passed"""
+
+
+@dataclass
+class TableEntry:
+    depth: int
+    value: int
+    kind: int
+    move: int | None
+
+
+def store_killer(killers: list[list[int]], ply: int, move: int) -> None:
+    """Make move the first of the num_of_killers killer moves of ply, which caused a cut-off there"""
+    if ply >= len(killers):
+        return
+    ply_killers = killers[ply]
+    if move not in ply_killers:
+        ply_killers.insert(0, move)
+        del ply_killers[num_of_killers:]
+
+
+def to_table(value: int, ply: int) -> int:
+    """Store wins as the distance from the stored position rather than from the root"""
+    if value > win_threshold:
+        return value + ply
+    if value < -win_threshold:
+        return value - ply
+    return value
+
+
+def from_table(value: int, ply: int) -> int:
+    if value > win_threshold:
+        return value - ply
+    if value < -win_threshold:
+        return value + ply
+    return value
+
+
+def describe(value: int) -> str:
+    if value > win_threshold:
+        return f"win in {win_score - value} plies"
+    if value < -win_threshold:
+        return f"loss in {win_score + value} plies"
+    return f"score {value}"
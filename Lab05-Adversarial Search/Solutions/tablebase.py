@@ -0,0 +1,257 @@
+import argparse
+import functools
+import itertools
+import math
+import os
+import random
+import struct
+import time
+from array import array
+
+from breakthrough import WHITE, BLACK, BreakthroughBoard, BreakthroughSearch, squares_of, win_score
+
+# Endgame tablebase for Breakthrough on small boards. Every position with at most max_pieces pieces is solved
+# exactly, with the number of plies to the end of the game, and stored as one signed byte:
+#   v > 0: the side to move wins in v plies
+#   v < 0: the side to move loses in -v - 1 plies (-1: it has no moves and loses now)
+#   v = 0: not a position (the index belongs to two pieces on one square)
+# Breakthrough has no draws, so every position is a win or a loss.
+#
+# The tables are built backwards from the end of the game, one material class (number of white and black
+# pieces) at a time, fewest pieces first. A capture leads to a class with fewer pieces, which is already
+# solved. Any other move keeps the class but brings one piece a row closer to its goal, so within a class a
+# position only leads to positions where the pieces have advanced further; solving the positions of a class
+# from the most advanced to the least advanced finds all their successors solved. No position is visited twice.
+#
+# Positions are numbered by their piece sets. A white piece can stand on every row but the last (where it
+# has won), a black piece on every row but the first. The k pieces of one side on the A squares they can
+# stand on are numbered 0 .. C(A, k) - 1 by the combinatorial number system: pieces on the squares
+# c1 < c2 < ... < ck are number C(c1, 1) + C(c2, 2) + ... + C(ck, k). A probe costs one term per piece.
+#
+# Example:
+#   python tablebase.py --sizes 5 6 --max-pieces 4
+
+tablebase_magic = b"BTTB"
+# Magic, board size, max pieces
+header_format = "<4sBB"
+default_max_pieces = 4
+default_sizes = (5, 6)
+# The search comparison uses positions with this many more pieces than the tablebase holds
+extra_pieces = 1
+default_comparison_depth = 10
+default_num_of_comparisons = 20
+tablebase_directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def tablebase_path(size: int, directory: str = tablebase_directory) -> str:
+    return os.path.join(directory, f"breakthrough_tablebase_{size}x{size}.bin")
+
+
+def material_classes(max_pieces: int) -> list[tuple[int, int]]:
+    """(white pieces, black pieces) with both sides on the board, fewest pieces first"""
+    return [(white, total - white) for total in range(2, max_pieces + 1) for white in range(1, total)]
+
+
+class Tablebase:
+    def __init__(self, size: int, max_pieces: int, values: array | None = None):
+        self.size = size
+        self.max_pieces = max_pieces
+        n = size
+        # The squares each side can stand on without having won, and the number of a square among them
+        self.allowed_squares = (list(range(n * (n - 1))), list(range(n, n * n)))
+        self.square_numbers = ([-1] * (n * n), [-1] * (n * n))
+        for side in (WHITE, BLACK):
+            for number, square in enumerate(self.allowed_squares[side]):
+                self.square_numbers[side][square] = number
+        num_of_allowed = n * (n - 1)
+        self.binomial = [[math.comb(c, k) for k in range(max_pieces + 1)] for c in range(num_of_allowed + 1)]
+
+        # Start of every material class in values; a class holds both sides to move of every pair of piece sets
+        self.offsets: dict[tuple[int, int], int] = {}
+        total = 0
+        for white, black in material_classes(max_pieces):
+            self.offsets[white, black] = total
+            total += 2 * math.comb(num_of_allowed, white) * math.comb(num_of_allowed, black)
+        self.values = values if values is not None else array("b", bytes(total))
+        if len(self.values) != total:
+            raise ValueError(f"Expected {total} values for a {n}x{n} tablebase of {max_pieces} pieces, "
+                             f"got {len(self.values)}")
+
+    def rank(self, pieces: int, side: int) -> int:
+        """Number of the set of pieces of side among all sets of that many pieces"""
+        numbers = self.square_numbers[side]
+        binomial = self.binomial
+        rank = 0
+        k = 0
+        while pieces:
+            lowest = pieces & -pieces
+            k += 1
+            rank += binomial[numbers[lowest.bit_length() - 1]][k]
+            pieces ^= lowest
+        return rank
+
+    def index(self, white: int, black: int, to_move: int) -> int:
+        num_of_black = black.bit_count()
+        offset = self.offsets[white.bit_count(), num_of_black]
+        black_sets = self.binomial[len(self.allowed_squares[BLACK])][num_of_black]
+        return offset + 2 * (self.rank(white, WHITE) * black_sets + self.rank(black, BLACK)) + to_move
+
+    def covers(self, board: BreakthroughBoard) -> bool:
+        """True if board is in the tablebase: small enough, both sides on the board, nobody on a goal row"""
+        return (board.size == self.size and board.counts[WHITE] + board.counts[BLACK] <= self.max_pieces
+                and board.counts[WHITE] > 0 and board.counts[BLACK] > 0
+                and not (board.pieces[WHITE] & board.goal_rows[WHITE] or board.pieces[BLACK] & board.goal_rows[BLACK]))
+
+    def probe(self, board: BreakthroughBoard) -> int:
+        """The stored value of a position the tablebase covers"""
+        return self.values[self.index(board.pieces[WHITE], board.pieces[BLACK], board.to_move)]
+
+    def score(self, board: BreakthroughBoard, ply: int) -> int:
+        """The value of a covered position as a search score at ply: a win or loss with its distance"""
+        value = self.probe(board)
+        if value > 0:
+            return win_score - ply - value
+        return -(win_score - ply - (-value - 1))
+
+    def save(self, path: str) -> None:
+        # Write to a temporary file first, so an interrupted run never leaves a truncated tablebase behind
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(struct.pack(header_format, tablebase_magic, self.size, self.max_pieces))
+            self.values.tofile(file)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Tablebase":
+        with open(path, "rb") as file:
+            magic, size, max_pieces = struct.unpack(header_format, file.read(struct.calcsize(header_format)))
+            if magic != tablebase_magic:
+                raise ValueError(f"{path} is not a Breakthrough tablebase")
+            values = array("b")
+            values.frombytes(file.read())
+        return cls(size, max_pieces, values)
+
+
+@functools.cache
+def find_tablebase(size: int, directory: str = tablebase_directory) -> Tablebase | None:
+    """The tablebase for size x size boards if one has been built, else None"""
+    path = tablebase_path(size, directory)
+    return Tablebase.load(path) if os.path.exists(path) else None
+
+
+def solve_class(tablebase: Tablebase, white_count: int, black_count: int) -> None:
+    """Fill in the values of one material class; every class with fewer pieces must be solved already"""
+    values = tablebase.values
+    board = BreakthroughBoard(tablebase.size)
+    board.counts = [white_count, black_count]
+
+    piece_sets = ([sum(1 << square for square in squares)
+                   for squares in itertools.combinations(tablebase.allowed_squares[WHITE], white_count)],
+                  [sum(1 << square for square in squares)
+                   for squares in itertools.combinations(tablebase.allowed_squares[BLACK], black_count)])
+    advancement = [{pieces: sum(board.advancement_of[side][square] for square in squares_of(pieces))
+                    for pieces in piece_sets[side]} for side in (WHITE, BLACK)]
+    positions = [(white, black) for white in piece_sets[WHITE] for black in piece_sets[BLACK] if not white & black]
+    positions.sort(key=lambda position: advancement[WHITE][position[0]] + advancement[BLACK][position[1]],
+                   reverse=True)
+
+    for white, black in positions:
+        for to_move in (WHITE, BLACK):
+            board.pieces = [white, black]
+            board.to_move = to_move
+            own, enemy = board.pieces[to_move], board.pieces[1 - to_move]
+            goal_row = board.goal_rows[to_move]
+            enemy_count = board.counts[1 - to_move]
+
+            # Fastest win, and slowest loss if there is no win
+            best_win, longest_loss = None, -1
+            for targets, offset in board.move_targets():
+                for to_square in squares_of(targets):
+                    to_bit = 1 << to_square
+                    if to_bit & goal_row or (to_bit & enemy and enemy_count == 1):
+                        best_win = 1
+                        break
+                    moved = own ^ (1 << to_square - offset) ^ to_bit
+                    if to_move == WHITE:
+                        child = values[tablebase.index(moved, enemy & ~to_bit, BLACK)]
+                    else:
+                        child = values[tablebase.index(enemy & ~to_bit, moved, WHITE)]
+                    if child < 0:
+                        # The opponent loses in -child - 1 plies
+                        if best_win is None or -child < best_win:
+                            best_win = -child
+                    elif best_win is None:
+                        longest_loss = max(longest_loss, child)
+                if best_win == 1:
+                    break
+
+            # With no moves at all the side to move loses now
+            value = best_win if best_win is not None else -(longest_loss + 1) - 1
+            values[tablebase.index(white, black, to_move)] = value
+
+
+def build_tablebase(size: int, max_pieces: int = default_max_pieces, verbose: bool = False) -> Tablebase:
+    tablebase = Tablebase(size, max_pieces)
+    for white_count, black_count in material_classes(max_pieces):
+        start_time = time.perf_counter()
+        solve_class(tablebase, white_count, black_count)
+        if verbose:
+            print(f"  {size}x{size}, {white_count} white {black_count} black: "
+                  f"{time.perf_counter() - start_time:.1f} s")
+    return tablebase
+
+
+def random_endgame(size: int, num_of_pieces: int, rng: random.Random) -> BreakthroughBoard:
+    """A random position with num_of_pieces pieces, at least one per side, and nobody on a goal row"""
+    board = BreakthroughBoard(size)
+    while True:
+        white_count = rng.randrange(1, num_of_pieces)
+        squares = rng.sample(range(size * size), num_of_pieces)
+        board.pieces = [sum(1 << square for square in squares[:white_count]),
+                        sum(1 << square for square in squares[white_count:])]
+        board.to_move = rng.choice((WHITE, BLACK))
+        board.recount()
+        if board.winner() is None:
+            return board
+
+
+def compare_search(tablebase: Tablebase, depth: int = default_comparison_depth,
+                   num_of_positions: int = default_num_of_comparisons, seed: int = 0) -> None:
+    """Nodes and time of a fixed-depth search of random endgames with and without the tablebase"""
+    rng = random.Random(seed)
+    positions = [random_endgame(tablebase.size, tablebase.max_pieces + extra_pieces, rng)
+                 for _ in range(num_of_positions)]
+    for name, used_tablebase in (("without", None), ("with", tablebase)):
+        nodes = hits = 0
+        seconds = 0.0
+        for position in positions:
+            search = BreakthroughSearch(tablebase=used_tablebase)
+            result = search.search(position, depth)
+            nodes += result.nodes
+            seconds += result.seconds
+            hits += search.tablebase_hits
+        print(f"  {num_of_positions} endgames of {tablebase.max_pieces + extra_pieces} pieces at depth {depth} {name} "
+              f"the tablebase: {nodes} nodes in {seconds:.2f} s, {hits} probes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build Breakthrough endgame tablebases for small boards")
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes)
+    parser.add_argument("--max-pieces", type=int, default=default_max_pieces)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        start_time = time.perf_counter()
+        tablebase = build_tablebase(size, args.max_pieces, verbose=True)
+        path = tablebase_path(size)
+        tablebase.save(path)
+        wins = sum(1 for value in tablebase.values if value > 0)
+        losses = sum(1 for value in tablebase.values if value < 0)
+        longest = max(max(tablebase.values), -min(tablebase.values) - 1)
+        print(f"{size}x{size}: {wins} wins and {losses} losses for the side to move, longest {longest} plies, "
+              f"{len(tablebase.values)} bytes written to {path} in {time.perf_counter() - start_time:.1f} s")
+        compare_search(tablebase)
+
+
+if __name__ == '__main__':
+    main()
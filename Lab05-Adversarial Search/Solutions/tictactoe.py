@@ -1,3 +1,5 @@
+import functools
+from array import array
 from enum import Enum
 from typing import Self
 
@@ -16,34 +18,114 @@ class Symbols(Enum):
 
 
 type Board = list[Symbols]
+# A board as two 9-bit masks, one for the squares of X and one for the squares of O.
+# Bit i is square i, counted row by row from the top left like the indices of a Board.
+type Bitboard = tuple[int, int]
+
+full_board = 0b111_111_111
+# The 3 rows, 3 columns and 2 diagonals
+win_masks = (
+    0b000_000_111, 0b000_111_000, 0b111_000_000,
+    0b001_001_001, 0b010_010_010, 0b100_100_100,
+    0b100_010_001, 0b001_010_100,
+)
+# A board is numbered as a 9-digit base 3 number, square i being digit i: 0 empty, 1 X, 2 O.
+# The solved tables have one entry for each of the 3^9 numbers.
+powers_of_three = tuple(3 ** square for square in range(9))
+num_of_positions = 3 ** 9
+# Value in the solved tables of positions that cannot be reached in a game
+unsolved = -2
+no_move = -1
 
 
 def minmax_decision(state: Board) -> int:
     """
-    returns the minimax decision of the opponent
+    returns the minimax decision of the player to move, X maximizing and O minimizing.
+    The whole game is solved once by solved_tables, so every call is a table lookup.
+    Between equally good moves the lowest square is chosen.
+    Raises ValueError if the game is already over or the position cannot be reached in a game.
     :param state: State of the checkerboard. Ex: [Unplaced; Unplaced; Unplaced; Unplaced; X; Unplaced; Unplaced; Unplaced; Unplaced]
     :return: int
     """
-    def max_value(state_option: Board) -> int:
-        if is_terminal(state_option):
-            return utility_of(state_option)
-        expected_value = -infinity
-        for (a, s) in successors_of(state_option):
-            expected_value = max(expected_value, min_value(s))
-        return expected_value
-
-    def min_value(state_option: Board) -> int:
-        if is_terminal(state_option):
-            return utility_of(state_option)
-        expected_value = infinity
-        for (a, s) in successors_of(state_option):
-            expected_value = min(expected_value, max_value(s))
-        return expected_value
-
-    infinity = float('inf')
-    action, state = max(successors_of(state), key=lambda a: min_value(a[1]))
-    return action
- 
+    _, best_moves = solved_tables()
+    best_move = best_moves[position_index(state)]
+    if best_move == no_move:
+        raise ValueError(f"No move in {[str(symbol) for symbol in state]}: the game is over or cannot be reached")
+    return best_move
+
+
+def to_bitboard(state: Board) -> Bitboard:
+    x_mask = o_mask = 0
+    for square, symbol in enumerate(state):
+        if symbol == Symbols.X:
+            x_mask |= 1 << square
+        elif symbol == Symbols.O:
+            o_mask |= 1 << square
+    return x_mask, o_mask
+
+
+def position_index(state: Board) -> int:
+    """Number of the board in the solved tables"""
+    index = 0
+    for square, symbol in enumerate(state):
+        if symbol == Symbols.X:
+            index += powers_of_three[square]
+        elif symbol == Symbols.O:
+            index += 2 * powers_of_three[square]
+    return index
+
+
+def has_line(mask: int) -> bool:
+    """True if the squares in mask complete a row, column or diagonal"""
+    for win_mask in win_masks:
+        if mask & win_mask == win_mask:
+            return True
+    return False
+
+
+@functools.cache
+def solved_tables() -> tuple[array, array]:
+    """
+    Solve tic-tac-toe from the empty board and return two arrays indexed by position_index: the minimax
+    value of every reachable position (+1 X wins, -1 O wins, 0 tie) and the best move for the player
+    to move, or no_move if the game is over. Only 5478 of the 3^9 positions can be reached.
+    """
+    values = array("b", [unsolved]) * num_of_positions
+    best_moves = array("b", [no_move]) * num_of_positions
+
+    def solve(x_mask: int, o_mask: int, index: int) -> int:
+        if values[index] != unsolved:
+            return values[index]
+
+        if has_line(x_mask):
+            value = +1
+        elif has_line(o_mask):
+            value = -1
+        elif x_mask | o_mask == full_board:
+            value = 0
+        else:
+            x_to_move = x_mask.bit_count() == o_mask.bit_count()
+            value, best_move = None, no_move
+            for square in range(9):
+                bit = 1 << square
+                if (x_mask | o_mask) & bit:
+                    continue
+                if x_to_move:
+                    child_value = solve(x_mask | bit, o_mask, index + powers_of_three[square])
+                    is_better = value is None or child_value > value
+                else:
+                    child_value = solve(x_mask, o_mask | bit, index + 2 * powers_of_three[square])
+                    is_better = value is None or child_value < value
+                if is_better:
+                    value, best_move = child_value, square
+            best_moves[index] = best_move
+
+        values[index] = value
+        return value
+
+    solve(0, 0, 0)
+    return values, best_moves
+
 
 def is_terminal(state: Board) -> bool:
     """
@@ -54,10 +136,8 @@ def is_terminal(state: Board) -> bool:
     return winner_of(state) is not None or is_full_board(state)
 
 def is_full_board(state: Board):
-    for i in range(9):
-        if state[i] == Symbols.UNPLACED: #not in [Symbols.O, Symbols.X]:
-            return False
-    return True
+    x_mask, o_mask = to_bitboard(state)
+    return x_mask | o_mask == full_board
 
 def utility_of(state: Board) -> int:
     """
@@ -78,20 +158,11 @@ def winner_of(state: Board):
     Returns 'X' if the first player won the game, 'O' if the second player won
     the game, or None if the game has not finished yet or if it is a tie.
     '''
-    # Checks horizontally
-    for c in [0, 3, 6]:
-        if state[c + 0] == state[c + 1] and state[c + 0] == state[c + 2] and state[c + 0]!=Symbols.UNPLACED:
-            return state[c + 0]
-    # Checks vertically
-    for c in [0, 1, 2]:
-        if state[c + 0] == state[c + 3] and state[c + 0] == state[c + 6] and state[c + 0]!=Symbols.UNPLACED:
-            return state[c+0]
-    # Checks diagonally [\]
-    if state[0] == state[4] and state[0] == state[8] and state[0]!=Symbols.UNPLACED:
-        return state[4]
-    # Checks diagonally [/]
-    if state[2] == state[4] and state[2] == state[6] and state[2]!=Symbols.UNPLACED: 
-        return state[4]
+    x_mask, o_mask = to_bitboard(state)
+    if has_line(x_mask):
+        return Symbols.X
+    if has_line(o_mask):
+        return Symbols.O
     return None
 
 